@@ -1,23 +1,34 @@
 import tkinter as tk
-import random
 import math
+import time
 import matplotlib # type: ignore
 matplotlib.use("TkAgg")
 from matplotlib.figure import Figure # type: ignore
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg # type: ignore
-from collections import defaultdict
 from variables import *
-from plant import Plant
+from graph_lod import decimate, thin, nice_ceil
 from herbivore import Herbivore
-from carnivore import Carnivore
+from world import World
+import neural_network
+from neural_network import ACTIVATIONS
+from renderer import CanvasRenderer, RasterRenderer
+from worker import SimulationWorker
+from export import MetricsWriter
+from timers import RollingTimer, moving_average
 
 class EvolutionSimulator:
-    def __init__(self, root):
+    def __init__(self, root, world=None, renderer=SYS_RENDERER):
         self.root = root
         self.root.title("Evolution Simulator")
 
-        # Field
-        self.field_w, self.field_h = SYS_FIELD_WIDTH, SYS_FIELD_HEIGHT
+        # World, stepped by a background worker. Everything drawn comes from its latest snapshot
+        self.world = world if world is not None else World()
+        self.field_w, self.field_h = self.world.field_w, self.world.field_h
+        if SYS_EXPORT_PATH:
+            self.world.export = MetricsWriter(SYS_EXPORT_PATH)
+        self.worker = SimulationWorker(self.world)
+        self.snapshot = self.worker.snapshot
+        self.drawn = None
 
         # Main layout frame
         self.frame = tk.Frame(root)
@@ -35,9 +46,21 @@ class EvolutionSimulator:
         tk.Button(self.speed_frame, text=" << ", command=self.decrease_speed).pack(side="left", padx=5, pady=5)
         tk.Button(self.speed_frame, text=" >> ", command=self.increase_speed).pack(side="right", padx=5, pady=5)
 
+        # Profiler panel, hidden unless SYS_PROFILER_PANEL is set or F3 is pressed
+        self.timer = RollingTimer() # Phases of update_loop, always timed
+        self.rates = {}             # Moving averages of ticks/s, frames/s and the counters
+        self.last_frame = None
+        self.last_calls = 0
+        self.profiler_frame = tk.Frame(self.left_panel, bg="#eee")
+        self.profiler_label = tk.Label(self.profiler_frame, text="", bg="#eee", font=("Courier", 9), justify="left", anchor="w")
+        self.profiler_label.pack(fill="x")
+        self.profile_button = tk.Button(self.profiler_frame, text=f"Profile {SYS_PROFILE_TICKS} ticks", command=self.start_profile)
+        self.profile_button.pack(pady=5)
+        self.profiler_shown = SYS_PROFILER_PANEL
+        if self.profiler_shown:
+            self.profiler_frame.pack(fill="x", padx=10)
+
         # Graph
-        self.tick_count = 0
-        self.sim_data = []
         self.fig = Figure(figsize=(3.0, 6.5), dpi=100)
 
         # Population graph (1)
@@ -45,9 +68,9 @@ class EvolutionSimulator:
         self.ax.set_title("Population")
         self.ax.set_xlabel("Ticks")
         self.ax.set_ylabel("Count")
-        self.line_plants, = self.ax.plot([], [], label="Plants (x10)", color="green")
-        self.line_herbs, = self.ax.plot([], [], label="Herbivores", color="blue")
-        self.line_carns, = self.ax.plot([], [], label="Carnivores", color="red")
+        self.line_plants, = self.ax.plot([], [], label="Plants (x10)", color="green", animated=SYS_GRAPH_BLIT)
+        self.line_herbs, = self.ax.plot([], [], label="Herbivores", color="blue", animated=SYS_GRAPH_BLIT)
+        self.line_carns, = self.ax.plot([], [], label="Carnivores", color="red", animated=SYS_GRAPH_BLIT)
         self.ax.legend(loc="upper left", fontsize=8)
 
         # Death cause graph (2)
@@ -55,9 +78,9 @@ class EvolutionSimulator:
         self.ax2.set_title("Herbivore Cause of Death (%)")
         self.ax2.set_xlabel("Ticks")
         self.ax2.set_ylabel("Percent of Deaths")
-        self.line_starve, = self.ax2.plot([], [], label="Starvation", color="green")
-        self.line_eaten, = self.ax2.plot([], [], label="Predation", color="red")
-        self.line_oldage, = self.ax2.plot([], [], label="Old Age", color="blue")
+        self.line_starve, = self.ax2.plot([], [], label="Starvation", color="green", animated=SYS_GRAPH_BLIT)
+        self.line_eaten, = self.ax2.plot([], [], label="Predation", color="red", animated=SYS_GRAPH_BLIT)
+        self.line_oldage, = self.ax2.plot([], [], label="Old Age", color="blue", animated=SYS_GRAPH_BLIT)
         self.ax2.set_ylim(0, 100)
         self.ax2.legend(loc="upper left", fontsize=8)
 
@@ -66,7 +89,7 @@ class EvolutionSimulator:
         self.ax3.set_title("Predator–Prey Cycle")
         self.ax3.set_xlabel("Carnivores")
         self.ax3.set_ylabel("Herbivores")
-        self.phase_line, = self.ax3.plot([], [], color="black", linewidth=0.75)
+        self.phase_line, = self.ax3.plot([], [], color="black", linewidth=0.75, animated=SYS_GRAPH_BLIT)
         self.ax3.grid(True, linestyle="--", alpha=0.5)
         
         self.fig.subplots_adjust(hspace=0.75)
@@ -74,6 +97,15 @@ class EvolutionSimulator:
         self.canvas_graph = FigureCanvasTkAgg(self.fig, master=self.left_panel)
         self.canvas_graph.get_tk_widget().pack(pady=10)
 
+        # Blitting: the axes, ticks and legends are only redrawn when the limits change,
+        # in between only the lines are drawn over a saved copy of the figure
+        self.graph_lines = [self.line_plants, self.line_herbs, self.line_carns,
+                            self.line_starve, self.line_eaten, self.line_oldage, self.phase_line]
+        self.graph_background = None
+        self.graph_limits = None
+        self.frame_count = 0
+        self.canvas_graph.mpl_connect("draw_event", self.on_graph_draw)
+
         # CENTER CANVAS
         self.canvas_w, self.canvas_h = 800, 800
         self.canvas = tk.Canvas(self.frame, width=self.canvas_w, height=self.canvas_h, bg="white")
@@ -97,28 +129,36 @@ class EvolutionSimulator:
         # State
         self.sim_speed = 1
         self.selected_organism = None
-        self.carnivores, self.herbivores, self.plants = [], [], []
+
+        # Draws the world onto the canvas
+        self.renderer = RasterRenderer(self.canvas) if renderer == "raster" else CanvasRenderer(self.canvas)
 
         # Camera
         self.camera_x, self.camera_y = 0, 0
         self.scale = 1.0
         self.drag_start = None
 
-        # Create objects
-        self.create_random_plants(SYS_START_PLANT_NUM)
-        self.create_random_herbivores(SYS_START_HERB_NUM)
-        self.create_random_carnivores(SYS_START_CARN_NUM)
-
         # Bindings
         self.canvas.bind("<Button-1>", self.on_click)
         self.canvas.bind("<ButtonPress-2>", self.start_drag)
         self.canvas.bind("<B2-Motion>", self.do_drag)
         self.canvas.bind("<MouseWheel>", self.do_zoom)
+        self.root.bind("<F3>", self.toggle_profiler)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.auto_center_and_zoom()
 
+        self.worker.start()
         self.update_loop()
 
+    # ------------------ Window ------------------
+    def on_close(self):
+        # The worker is a daemon thread, stop it first so the export rows it buffered get written
+        self.worker.stop()
+        if self.world.export is not None:
+            self.world.export.close()
+        self.root.destroy()
+
     # ------------------ Camera ------------------
     def start_drag(self, event):
         self.drag_start = (event.x, event.y)
@@ -149,35 +189,29 @@ class EvolutionSimulator:
 
     # ------------------ Speed ------------------
     def increase_speed(self):
+        if self.sim_speed == SYS_SPEED_UNLIMITED:
+            return
         current_index = SYS_SPEED_LEVELS.index(self.sim_speed) if self.sim_speed in SYS_SPEED_LEVELS else 1
         if current_index < len(SYS_SPEED_LEVELS) - 1:
-            self.sim_speed = SYS_SPEED_LEVELS[current_index + 1]
-        self.speed_label.config(text=f"Speed: {self.sim_speed}x")
+            self.set_speed(SYS_SPEED_LEVELS[current_index + 1])
+        else:
+            self.set_speed(SYS_SPEED_UNLIMITED)
 
     def decrease_speed(self):
+        if self.sim_speed == SYS_SPEED_UNLIMITED:
+            self.set_speed(SYS_SPEED_LEVELS[-1])
+            return
         current_index = SYS_SPEED_LEVELS.index(self.sim_speed) if self.sim_speed in SYS_SPEED_LEVELS else 1
         if current_index > 0:
-            self.sim_speed = SYS_SPEED_LEVELS[current_index - 1]
-        self.speed_label.config(text=f"Speed: {self.sim_speed}x" if self.sim_speed > 0 else "Paused")
-
-    # ------------------ Organisms & Plants ------------------
-    def create_random_herbivores(self, count):
-        for _ in range(count):
-            x = random.randint(50, self.field_w-50)
-            y = random.randint(50, self.field_h-50)
-            self.herbivores.append(Herbivore(self.canvas, x, y))
-
-    def create_random_carnivores(self, count):
-        for _ in range(count):
-            x = random.randint(50, self.field_w-50)
-            y = random.randint(50, self.field_h-50)
-            self.carnivores.append(Carnivore(self.canvas, x, y))
-
-    def create_random_plants(self, count):
-        for _ in range(count):
-            x = random.randint(20, self.field_w-20)
-            y = random.randint(20, self.field_h-20)
-            self.plants.append(Plant(self.canvas, x, y))
+            self.set_speed(SYS_SPEED_LEVELS[current_index - 1])
+
+    def set_speed(self, speed):
+        self.sim_speed = speed
+        self.worker.speed = speed
+        if speed == SYS_SPEED_UNLIMITED:
+            self.speed_label.config(text="Speed: Unlimited")
+        else:
+            self.speed_label.config(text=f"Speed: {speed}x" if speed > 0 else "Paused")
 
     # ------------------ Click & Info ------------------
     def on_click(self, event):
@@ -188,22 +222,16 @@ class EvolutionSimulator:
         nearest_dist_sq = float('inf')
         max_click_dist = SYS_MAX_CLICK_DIST / self.scale
 
-        # Get all organisms
-        for herb in self.herbivores:
-            if herb.alive:
-                dx = wx - herb.x
-                dy = wy - herb.y
-                dist_sq = dx*dx + dy*dy
-                if dist_sq <= (herb.radius + max_click_dist)**2 and dist_sq < nearest_dist_sq:
-                    nearest = herb
-                    nearest_dist_sq = dist_sq
-        for carn in self.carnivores:
-            if carn.alive:
-                dx = wx - carn.x
-                dy = wy - carn.y
+        # Get nearby organisms
+        search = max_click_dist + max(HERB_RADIUS_START, CARN_RADIUS_START)
+        candidates = self.snapshot.herb_index.nearby(wx, wy, search) + self.snapshot.carn_index.nearby(wx, wy, search)
+        for organism in candidates:
+            if organism.alive:
+                dx = wx - organism.x
+                dy = wy - organism.y
                 dist_sq = dx*dx + dy*dy
-                if dist_sq <= (carn.radius + max_click_dist)**2 and dist_sq < nearest_dist_sq:
-                    nearest = carn
+                if dist_sq <= (organism.species.radius + max_click_dist)**2 and dist_sq < nearest_dist_sq:
+                    nearest = organism
                     nearest_dist_sq = dist_sq
 
         # Assign selection
@@ -215,21 +243,14 @@ class EvolutionSimulator:
     def display_info(self, organism):
         rot_deg = math.degrees(organism.rotation) % 360
 
-        inputs = None
-        if isinstance(organism, Herbivore) or isinstance(organism, Carnivore):
-            inputs = organism.get_inputs(
-                plant_grid=getattr(self, "plant_grid", None),
-                herb_grid=getattr(self, "herb_grid", None),
-                carn_grid=getattr(self, "carn_grid", None),
-            )
-
+        # Inputs and activations of the organism's last tick, so neither vision nor the network is evaluated a second time
         if hasattr(organism, "nn"):
-            self.draw_nn(organism.nn, inputs=inputs)
+            self.draw_nn(organism.nn, organism.inputs, organism.activations)
 
         is_herb = isinstance(organism, Herbivore)
         label_value_pairs = [
             ("", f"{'Herbivore' if is_herb else 'Carnivore'} #{organism.id} (Gen {organism.generation})"),
-            ("Color: ", organism.color),
+            ("Color: ", "#{:02x}{:02x}{:02x}".format(*organism.color)),
             ("Pos: ", f"({int(organism.x)}, {int(organism.y)})"),
             ("Rotation: ", f"{round(rot_deg, 1)}°"),
             ("Speed: ", f"{round(organism.speed, 2)}"),
@@ -247,25 +268,14 @@ class EvolutionSimulator:
 
         self.info_box.config(state="disabled")
 
-    def draw_nn(self, nn, inputs=None):
+    def draw_nn(self, nn, inputs=None, activations=None):
         self.nn_canvas.delete("all")
 
+        # The (hidden, outputs) the organism decided with, all zeros until it has thought once
+        n_in, n_hidden = nn.input_size, nn.hidden_size
         if inputs is None:
-            inputs = [0.0] * len(nn.w1[0])
-
-        hidden = [0.0 for _ in range(len(nn.w1))]
-        for j in range(len(nn.w1)):
-            s = nn.b1[j]
-            for i in range(len(inputs)):
-                s += inputs[i] * nn.w1[j][i]
-            hidden[j] = max(0, s)
-
-        outputs = [0.0 for _ in range(len(nn.w2))]
-        for j in range(len(nn.w2)):
-            s = nn.b2[j]
-            for i in range(len(hidden)):
-                s += hidden[i] * nn.w2[j][i]
-            outputs[j] = math.tanh(s)
+            inputs = [0.0] * n_in
+        hidden, outputs = activations if activations is not None else ([0.0] * n_hidden, [0.0] * 2)
 
         layers = [inputs, hidden, outputs]
         sizes = [len(layer) for layer in layers]
@@ -286,7 +296,7 @@ class EvolutionSimulator:
         # Draw weights (input & hidden)
         for i, (x1, y1) in enumerate(positions[0]):
             for j, (x2, y2) in enumerate(positions[1]):
-                w = nn.w1[j][i]
+                w = nn.w1[j * n_in + i]
                 color = "blue" if w > 0 else "red"
                 width = max(1, int(abs(w) * 2))
                 self.nn_canvas.create_line(x1, y1, x2, y2, fill=color, width=width)
@@ -294,7 +304,7 @@ class EvolutionSimulator:
         # Draw weights (hidden & output)
         for i, (x1, y1) in enumerate(positions[1]):
             for j, (x2, y2) in enumerate(positions[2]):
-                w = nn.w2[j][i]
+                w = nn.w2[j * n_hidden + i]
                 color = "blue" if w > 0 else "red"
                 width = max(1, int(abs(w) * 2))
                 self.nn_canvas.create_line(x1, y1, x2, y2, fill=color, width=width)
@@ -325,229 +335,191 @@ class EvolutionSimulator:
             label = output_labels[i] if i < len(output_labels) else f"Out{i+1}"
             self.nn_canvas.create_text(x + 20, y, text=label, font=("Arial", 9, "bold"), fill="black", anchor="w")
 
-    # ------------------ Graph & Data ------------------
-    def update_data(self):
-        if not self.plants and not self.herbivores and not self.carnivores:
-            return
-
-        total_plants = len(self.plants)
-        total_herbs = sum(1 for h in self.herbivores if h.alive)
-        total_carns = sum(1 for c in self.carnivores if c.alive)
-
-        herb_starve_deaths = sum(1 for h in self.herbivores if not h.alive and getattr(h, "death_cause", "") == "starvation")
-        herb_eaten_deaths = sum(1 for h in self.herbivores if not h.alive and getattr(h, "death_cause", "") == "eaten")
-        herb_oldage_deaths = sum(1 for h in self.herbivores if not h.alive and getattr(h, "death_cause", "") == "old_age")
-
-        self.sim_data.append([
-            total_plants,
-            total_herbs,
-            total_carns,
-            herb_starve_deaths,
-            herb_eaten_deaths,
-            herb_oldage_deaths,
-        ])
-
-        if len(self.sim_data) > SYS_GRAPH_MEMORY:
-            self.sim_data.pop(0)
-
-        self.tick_count += 1
-
+    # ------------------ Graph ------------------
     def update_graphs(self):
-        if not self.sim_data:
+        metrics = self.snapshot.metrics
+        if len(metrics) == 0:
             return
 
-        data = list(zip(*self.sim_data))
-        ticks = range(len(self.sim_data))
+        ticks = metrics.series("tick")
+        plants = metrics.series("plants") / 10
+        herbs = metrics.series("herbivores")
+        carns = metrics.series("carnivores")
 
-        plants = [v / 10 for v in data[0]]
-        herbs = list(data[1])
-        carns = list(data[2])
-        starve_deaths = list(data[3])
-        eaten_deaths = list(data[4])
-        oldage_deaths = list(data[5])
+        # Only send about as many points as each graph is wide in pixels
+        width = max(1, int(self.ax.bbox.width))
 
         # Population graph (1)
-        self.line_plants.set_data(ticks, plants)
-        self.line_herbs.set_data(ticks, herbs)
-        self.line_carns.set_data(ticks, carns)
-        self.ax.set_xlim(0, len(self.sim_data))
-        ymax = max(max(plants + herbs + carns), 1) + 5
-        self.ax.set_ylim(0, ymax)
+        self.line_plants.set_data(*decimate(ticks, plants, width))
+        self.line_herbs.set_data(*decimate(ticks, herbs, width))
+        self.line_carns.set_data(*decimate(ticks, carns, width))
 
         # Death cause graph (2)
-        recent_window = SYS_DEATH_WINDOW_SIZE
+        self.line_starve.set_data(*decimate(ticks, metrics.series("pct_starvation"), width))
+        self.line_eaten.set_data(*decimate(ticks, metrics.series("pct_eaten"), width))
+        self.line_oldage.set_data(*decimate(ticks, metrics.series("pct_old_age"), width))
 
         # Predator–prey phase plot (3)
-        if len(carns) > 0 and len(herbs) > 0:
-            self.phase_line.set_data(carns, herbs)
-            self.ax3.set_xlim(0, max(carns) + 5)
-            self.ax3.set_ylim(0, max(herbs) + 5)
-
-        perc_starve = []
-        perc_eaten = []
-        perc_oldage = []
-
-        for i in range(len(starve_deaths)):
-            start = max(0, i - recent_window)
-            s_sum = sum(starve_deaths[start:i+1])
-            e_sum = sum(eaten_deaths[start:i+1])
-            o_sum = sum(oldage_deaths[start:i+1])
-            total = s_sum + e_sum + o_sum
-
-            if total > 0:
-                perc_starve.append(s_sum / total * 100)
-                perc_eaten.append(e_sum / total * 100)
-                perc_oldage.append(o_sum / total * 100)
-            else:
-                perc_starve.append(0)
-                perc_eaten.append(0)
-                perc_oldage.append(0)
-
-        self.line_starve.set_data(ticks, perc_starve)
-        self.line_eaten.set_data(ticks, perc_eaten)
-        self.line_oldage.set_data(ticks, perc_oldage)
-        self.ax2.set_xlim(0, len(self.sim_data))
-        self.ax2.set_ylim(0, 100)
-
-        # Draw graphs
-        self.canvas_graph.draw()
+        self.phase_line.set_data(*thin(carns, herbs, 4 * width))
+
+        # Limits grow in steps, so the full figure only has to be redrawn now and then
+        span = nice_ceil(max(ticks[-1] - ticks[0], 100) * 1.1)
+        x0 = ticks[0] // (span / 10) * (span / 10)
+        ymax = max(metrics.max("plants") / 10, metrics.max("herbivores"), metrics.max("carnivores"), 1) + 5
+        limits = (x0, x0 + span, nice_ceil(ymax), nice_ceil(metrics.max("carnivores") + 5), nice_ceil(metrics.max("herbivores") + 5))
+
+        if limits != self.graph_limits or self.graph_background is None or not SYS_GRAPH_BLIT:
+            self.graph_limits = limits
+            self.ax.set_xlim(limits[0], limits[1])
+            self.ax.set_ylim(0, limits[2])
+            self.ax2.set_xlim(limits[0], limits[1])
+            self.ax2.set_ylim(0, 100)
+            self.ax3.set_xlim(0, limits[3])
+            self.ax3.set_ylim(0, limits[4])
+            self.canvas_graph.draw()
+        else:
+            self.blit_graphs()
+
+    def on_graph_draw(self, event):
+        # After any full redraw (limits changed, window resized...) save the background and put the lines back
+        if SYS_GRAPH_BLIT:
+            self.graph_background = self.canvas_graph.copy_from_bbox(self.fig.bbox)
+            self.blit_graphs()
+
+    def blit_graphs(self):
+        self.canvas_graph.restore_region(self.graph_background)
+        for line in self.graph_lines:
+            line.axes.draw_artist(line)
+        self.canvas_graph.blit(self.fig.bbox)
+
+    # ------------------ Drawing ------------------
+    def draw_world(self):
+        view_w = self.canvas.winfo_width()
+        view_h = self.canvas.winfo_height()
+        if view_w <= 1 or view_h <= 1:
+            view_w, view_h = self.canvas_w, self.canvas_h # Canvas not mapped yet
+
+        # Nothing to redraw while paused and the camera stands still
+        drawn = (self.snapshot, self.camera_x, self.camera_y, self.scale, view_w, view_h, self.selected_organism)
+        if drawn == self.drawn:
+            return
+        self.drawn = drawn
+        self.renderer.render(self.snapshot, self.camera_x, self.camera_y, self.scale, view_w, view_h, self.selected_organism)
+
+    # ------------------ Profiler ------------------
+    def toggle_profiler(self, event=None):
+        self.profiler_shown = not self.profiler_shown
+        if self.profiler_shown:
+            self.profiler_frame.pack(fill="x", padx=10, before=self.canvas_graph.get_tk_widget())
+            self.update_profiler()
+        else:
+            self.profiler_frame.pack_forget()
+
+    def start_profile(self):
+        self.worker.profile(SYS_PROFILE_TICKS, SYS_PROFILE_PATH)
+        self.profile_button.config(text="Profiling...", state="disabled")
+
+    def measure(self, old_snapshot):
+        # Rolling rates from the difference between two snapshots, and canvas calls per frame
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            self.rates["fps"] = moving_average(self.rates.get("fps"), 1 / max(now - self.last_frame, 1e-6))
+        self.last_frame = now
+        calls = self.renderer.calls
+        self.rates["calls"] = moving_average(self.rates.get("calls"), calls - self.last_calls)
+        self.last_calls = calls
+
+        new = self.snapshot
+        ticks = new.tick_count - old_snapshot.tick_count
+        if new is old_snapshot or ticks <= 0:
+            return
+        self.rates["tps"] = moving_average(self.rates.get("tps"), ticks / max(new.time - old_snapshot.time, 1e-6))
+        self.rates["queries"] = moving_average(self.rates.get("queries"), (new.queries - old_snapshot.queries) / ticks)
+        self.rates["examined"] = moving_average(self.rates.get("examined"), (new.examined - old_snapshot.examined) / ticks)
+
+    def update_profiler(self):
+        rates = self.rates
+        lines = ["Tick (ms)"]
+        lines += [f"  {name:<11}{ms:7.2f}" for name, ms in self.snapshot.phase_ms.items()]
+        lines.append("Frame (ms)")
+        lines += [f"  {name:<11}{s * 1000:7.2f}" for name, s in self.timer.averages.items()]
+        lines += [
+            f"Ticks/s      {rates.get('tps', 0):7.1f}",
+            f"Frames/s     {rates.get('fps', 0):7.1f}",
+            f"Queries/tick {rates.get('queries', 0):7.0f}",
+            f"Checked/tick {rates.get('examined', 0):7.0f}",
+            f"Canvas/frame {rates.get('calls', 0):7.0f}",
+        ]
+        if self.worker.profiled:
+            lines.append(f"Saved {self.worker.profiled}")
+        self.profiler_label.config(text="\n".join(lines))
+        if self.worker.profiler is None and self.worker.profile_request is None:
+            self.profile_button.config(text=f"Profile {SYS_PROFILE_TICKS} ticks", state="normal")
 
     # ------------------ Main Loop ------------------
     def update_loop(self):
-        # Skip if paused
-        if self.sim_speed == 0:
-            self.root.after(100, self.update_loop)
-            return
+        timer = self.timer
+        timer.start()
 
-        for _ in range(self.sim_speed):
-            # Build spatial grids
-            self.plant_grid = defaultdict(list)
-            self.herb_grid = defaultdict(list)
-            self.carn_grid = defaultdict(list)
-
-            for p in self.plants:
-                cell = (int(p.x // SYS_CELL_SIZE), int(p.y // SYS_CELL_SIZE))
-                self.plant_grid[cell].append(p)
-
-            for h in self.herbivores:
-                cell = (int(h.x // SYS_CELL_SIZE), int(h.y // SYS_CELL_SIZE))
-                self.herb_grid[cell].append(h)
-
-            for c in self.carnivores:
-                cell = (int(c.x // SYS_CELL_SIZE), int(c.y // SYS_CELL_SIZE))
-                self.carn_grid[cell].append(c)
-
-            # Update all organisms
-            for plant in self.plants[:]:
-                plant.try_duplicate(self.canvas, self.plants, self.field_w, self.field_h)
-            for herb in self.herbivores:
-                herb.update(self.canvas, self.field_w, self.field_h, self.plant_grid, self.herb_grid, self.carn_grid, self.plants, self.herbivores, self.carnivores)
-            for carn in self.carnivores:
-                carn.update(self.canvas, self.field_w, self.field_h, self.plant_grid, self.herb_grid, self.carn_grid, self.plants, self.herbivores, self.carnivores)
-                
-            # Update data
-            self.update_data()
+        # Latest state published by the worker, the selection follows the organism into it
+        old_snapshot = self.snapshot
+        new_snapshot = self.worker.snapshot is not self.snapshot
+        self.snapshot = self.worker.snapshot
+        self.selected_organism = self.snapshot.find(self.selected_organism)
+        timer.lap("snapshot")
 
         # Redraw objects
-        for plant in self.plants:
-            x = (plant.x - self.camera_x) * self.scale
-            y = (plant.y - self.camera_y) * self.scale
-            r = plant.size / 2 * self.scale
-            self.canvas.coords(plant.shape, x - r, y - r, x + r, y + r)
-
-        for herb in self.herbivores:
-            if herb.alive:
-                x = (herb.x - self.camera_x) * self.scale
-                y = (herb.y - self.camera_y) * self.scale
-                r = herb.radius * self.scale
-
-                # Vision cone parameters
-                cone_length = HERB_VISION_CONE_LENGTH * self.scale
-                half_angle = HERB_VISION_CONE_WIDTH
-
-                # Calculate vision cone
-                left_angle = herb.rotation - half_angle
-                right_angle = herb.rotation + half_angle
-
-                x1 = x + math.cos(left_angle) * cone_length
-                y1 = y + math.sin(left_angle) * cone_length
-                x2 = x + math.cos(right_angle) * cone_length
-                y2 = y + math.sin(right_angle) * cone_length
-
-                # Body & facing line
-                self.canvas.coords(herb.shape, x - r, y - r, x + r, y + r)
-                self.canvas.coords(herb.facing_line, x, y,
-                                   x + math.cos(herb.rotation) * r,
-                                   y + math.sin(herb.rotation) * r)
-
-                # Update vision cone
-                self.canvas.coords(herb.vision_poly, x, y, x1, y1, x2, y2)
-
-                # Darker when spectated
-                stipple = "gray75" if herb is self.selected_organism else "gray25"
-                self.canvas.itemconfig(herb.vision_poly, stipple=stipple)
-            else:
-                self.canvas.itemconfig(herb.shape, state='hidden')
-                self.canvas.itemconfig(herb.facing_line, state='hidden')
-                self.canvas.itemconfig(herb.vision_poly, state='hidden')
-
-        for carn in self.carnivores:
-            if carn.alive:
-                x = (carn.x - self.camera_x) * self.scale
-                y = (carn.y - self.camera_y) * self.scale
-                r = carn.radius * self.scale
-
-                # Vision cone parameters
-                cone_length = CARN_VISION_CONE_LENGTH * self.scale
-                half_angle = CARN_VISION_CONE_WIDTH
-
-                # Calculate vision cone
-                left_angle = carn.rotation - half_angle
-                right_angle = carn.rotation + half_angle
-
-                x1 = x + math.cos(left_angle) * cone_length
-                y1 = y + math.sin(left_angle) * cone_length
-                x2 = x + math.cos(right_angle) * cone_length
-                y2 = y + math.sin(right_angle) * cone_length
-
-                # Body & facing line
-                self.canvas.coords(carn.shape, x - r, y - r, x + r, y + r)
-                self.canvas.coords(carn.facing_line, x, y,
-                                   x + math.cos(carn.rotation) * r,
-                                   y + math.sin(carn.rotation) * r)
-
-                # Update vision cone
-                self.canvas.coords(carn.vision_poly, x, y, x1, y1, x2, y2)
-
-                # Darker when spectated
-                stipple = "gray75" if carn is self.selected_organism else "gray25"
-                self.canvas.itemconfig(carn.vision_poly, stipple=stipple)
-            else:
-                self.canvas.itemconfig(carn.shape, state='hidden')
-                self.canvas.itemconfig(carn.facing_line, state='hidden')
-                self.canvas.itemconfig(carn.vision_poly, state='hidden')
-
-        if self.selected_organism and self.selected_organism.alive:
+        self.draw_world()
+        timer.lap("render")
+
+        if self.selected_organism:
             self.display_info(self.selected_organism)
         else:
-            self.selected_organism = None
             self.info_box.config(state="normal")
             self.info_box.delete("1.0", "end")
             self.info_box.insert("end", "Select an organism")
             self.info_box.config(state="disabled")
+        timer.lap("info")
 
         # Rerender graph
-        if not any(h.alive for h in self.herbivores) or not any(c.alive for c in self.carnivores) or len(self.plants) == 0:
-            return
-        else:
-            if self.tick_count % 1 == 0:
+        if new_snapshot:
+            self.frame_count += 1
+            if self.frame_count % SYS_GRAPH_REFRESH_INTERVAL == 0 or self.snapshot.is_over():
                 self.update_graphs()
+        timer.lap("graphs")
 
-        # Next frame
-        self.root.after(int(100 / self.sim_speed), self.update_loop)
+        # Timings, refreshed as often as the graphs
+        self.measure(old_snapshot)
+        if self.profiler_shown and (self.frame_count % SYS_GRAPH_REFRESH_INTERVAL == 0 or self.snapshot.is_over()):
+            self.update_profiler()
+        timer.lap("profiler")
+        timer.end_frame()
+
+        if self.snapshot.is_over():
+            return
+
+        # Next frame, at a fixed rate whatever the speed
+        self.root.after(int(1000 / SYS_FPS), self.update_loop)
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evolution simulator with a GUI")
+    parser.add_argument("--resume", metavar="FILE", help="Continue from a checkpoint of the object engine (see checkpoint.py)")
+    parser.add_argument("--activation", choices=ACTIVATIONS, default=None, help="Neuron activation, see neural_network.py. NN_ACTIVATION by default, or the checkpoint's with --resume")
+    args = parser.parse_args()
+
+    world = None
+    if args.resume:
+        import checkpoint
+        try:
+            world = checkpoint.load(args.resume, "object")
+        except ValueError as e:
+            parser.error(str(e))
+    if args.activation:
+        neural_network.ACTIVATION = args.activation
+
     root = tk.Tk()
-    app = EvolutionSimulator(root)
+    app = EvolutionSimulator(root, world)
     root.mainloop()
@@ -0,0 +1,210 @@
+import json
+import math
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+import variables
+
+# ----------------------
+# Benchmarks
+# ----------------------
+# Times the tick pipeline on worlds of several sizes. A size is a starting
+# plant count: the herbivore and carnivore counts and the field area are
+# scaled from the SYS_START_* and SYS_FIELD_* constants by the same factor, so
+# every size has the same densities as the default world. Every case runs in
+# a freshly spawned process, so its peak memory is its own, with a fixed seed,
+# and the results are written as JSON to compare later runs against.
+
+# Phases every engine laps, see World.step and VectorWorld.step
+PHASES = ("plants", "herbivores", "carnivores", "cleanup", "stats")
+
+def scaled_settings(plants):
+    factor = plants / variables.SYS_START_PLANT_NUM
+    side = math.sqrt(factor)
+    return {
+        "SYS_START_PLANT_NUM": plants,
+        "SYS_START_HERB_NUM": max(1, round(variables.SYS_START_HERB_NUM * factor)),
+        "SYS_START_CARN_NUM": max(1, round(variables.SYS_START_CARN_NUM * factor)),
+        "SYS_FIELD_WIDTH": max(100, round(variables.SYS_FIELD_WIDTH * side)),
+        "SYS_FIELD_HEIGHT": max(100, round(variables.SYS_FIELD_HEIGHT * side)),
+    }
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024 # Bytes on macOS, KiB elsewhere
+
+def run_case(job):
+    # Runs inside a worker process
+    engine, plants, ticks, warmup, seed, processes, render = job
+    settings = scaled_settings(plants)
+    for name, value in settings.items():
+        setattr(variables, name, value)
+
+    from timers import PhaseTimer, timed
+    w, h = settings["SYS_FIELD_WIDTH"], settings["SYS_FIELD_HEIGHT"]
+    start = time.perf_counter()
+    if engine == "vector":
+        from vector_world import VectorWorld
+        world = VectorWorld(w, h, seed=seed)
+    elif engine == "tiled":
+        from tiled_world import TiledWorld
+        world = TiledWorld(w, h, seed=seed, processes=processes)
+    else:
+        from world import World
+        world = World(w, h, seed=seed)
+    setup = time.perf_counter() - start
+
+    for _ in range(warmup):
+        if world.is_over():
+            break
+        world.step()
+
+    # Spatial index upkeep (object engine) or grid builds and searches (array engines), part of the species phases
+    timer = world.timer = PhaseTimer()
+    if engine == "object":
+        world.reindex = timed(timer, "spatial", world.reindex)
+    else:
+        world.nearest_in_cone = timed(timer, "spatial", world.nearest_in_cone)
+        world.contacts = timed(timer, "spatial", world.contacts)
+
+    # Frames of the whole field as the raster renderer paints them, the canvas one needs a window
+    painter = None
+    if render and engine == "object":
+        from renderer import RasterRenderer
+        painter = RasterRenderer(None)
+        view = 800
+        scale = view / max(w, h)
+
+    ran = 0
+    stepping = 0.0
+    for _ in range(ticks):
+        if world.is_over():
+            break
+        start = time.perf_counter()
+        world.step()
+        stepping += time.perf_counter() - start
+        ran += 1
+        if painter is not None:
+            timer.start()
+            painter.paint(world, 0, 0, scale, round(w * scale), round(h * scale))
+            timer.lap("render")
+
+    if engine == "tiled":
+        world.close()
+
+    totals = timer.totals
+    per_tick = {name: totals.get(name, 0.0) * 1000 / max(ran, 1) for name in PHASES + ("spatial", "render")}
+    return {
+        "engine": engine,
+        "plants": plants,
+        "herbivores": settings["SYS_START_HERB_NUM"],
+        "carnivores": settings["SYS_START_CARN_NUM"],
+        "field": [w, h],
+        "seed": seed,
+        "ticks": ran,
+        "setup_s": round(setup, 4),
+        "ticks_per_s": round(ran / stepping, 2) if stepping else None,
+        "phase_ms": {name: round(ms, 4) for name, ms in per_tick.items() if name != "render"},
+        "render_ms": round(per_tick["render"], 4) if painter is not None else None,
+        "peak_memory_mb": peak_memory_mb(),
+        "final": {name: int(world.metrics.last(name)) for name in ("plants", "herbivores", "carnivores")} if len(world.metrics) else None,
+    }
+
+def machine():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    import numpy
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def run_benchmarks(engines, sizes, ticks, warmup=10, seed=1, processes=None, render=True):
+    jobs = [(engine, plants, ticks, warmup, seed, processes, render) for engine in engines for plants in sizes]
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for job in jobs:
+        # One process at a time, so cases don't slow each other down. Not a Pool, the tiled engine starts its own
+        queue = ctx.Queue()
+        process = ctx.Process(target=run_case_into, args=(job, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        results.append(result)
+        print(format_result(result))
+    return {"machine": machine(), "results": results}
+
+def run_case_into(job, queue):
+    queue.put(run_case(job))
+
+def format_result(result):
+    phases = ", ".join(f"{name} {ms:.2f}" for name, ms in result["phase_ms"].items())
+    render = f", render {result['render_ms']:.2f}ms/frame" if result["render_ms"] is not None else ""
+    memory = f", peak {result['peak_memory_mb']:.0f}MB" if result["peak_memory_mb"] is not None else ""
+    return (f"{result['engine']:>6} {result['plants']:>7} plants: {result['ticks_per_s']} ticks/s over {result['ticks']} ticks "
+            f"(ms/tick: {phases}){render}{memory}")
+
+def compare(old, new, tolerance):
+    # Prints the ticks/s change of every case in both result sets, returns whether any got slower than tolerance allows
+    before = {(r["engine"], r["plants"]): r for r in old["results"]}
+    slower = False
+    for result in new["results"]:
+        previous = before.get((result["engine"], result["plants"]))
+        if previous is None or not previous["ticks_per_s"] or not result["ticks_per_s"]:
+            continue
+        change = result["ticks_per_s"] / previous["ticks_per_s"] - 1
+        regressed = change < -tolerance
+        slower = slower or regressed
+        print(f"{result['engine']:>6} {result['plants']:>7} plants: {previous['ticks_per_s']} -> {result['ticks_per_s']} ticks/s "
+              f"({change:+.1%}){'  SLOWER' if regressed else ''}")
+    return slower
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time the simulation's tick phases on worlds of several sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="Starting plant counts, organisms and field area scale along")
+    parser.add_argument("--engines", nargs="+", choices=["object", "vector", "tiled"], default=["object", "vector"], help="Engines to time")
+    parser.add_argument("--ticks", type=int, default=100, help="Ticks timed per case")
+    parser.add_argument("--warmup", type=int, default=10, help="Ticks run before timing starts")
+    parser.add_argument("--seed", type=int, default=1, help="Seed every case runs with")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes for the tiled engine, all cores by default")
+    parser.add_argument("--no-render", action="store_true", help="Skip timing the raster renderer")
+    parser.add_argument("--out", default="bench.json", help="JSON file the results are written to")
+    parser.add_argument("--compare", metavar="FILE", help="Earlier results to compare against, exits with 1 when a case got slower")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Slowdown allowed by --compare before it counts, 0.1 is 10%%")
+    parser.add_argument("--frame-budget", type=float, metavar="MS", help="Exits with 1 when the raster renderer took longer per frame, 1000 / SYS_FPS is the GUI's redraw interval")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.engines, args.sizes, args.ticks, args.warmup, args.seed, args.processes, not args.no_render)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.frame_budget is not None:
+        over = [r for r in report["results"] if r["render_ms"] is not None and r["render_ms"] > args.frame_budget]
+        for result in over:
+            print(f"{result['engine']:>6} {result['plants']:>7} plants: render {result['render_ms']:.2f}ms/frame, over the {args.frame_budget:g}ms budget")
+        if over:
+            raise SystemExit(1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        if compare(old, report, args.tolerance):
+            raise SystemExit(1)
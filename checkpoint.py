@@ -0,0 +1,240 @@
+import json
+import os
+from array import array
+import numpy as np
+from plant import Plant
+from herbivore import Herbivore
+from carnivore import Carnivore
+from world import World
+from vector_world import VectorWorld
+import neural_network
+from neural_network import NeuralNetwork
+
+# ----------------------
+# Checkpoints
+# ----------------------
+# Saves a whole World or VectorWorld to one .npz file of plain columns (one
+# array per attribute, one row per plant or living organism, network weights
+# as (count, rows, cols) arrays) plus a JSON string with the scalars: tick,
+# id counters, death counts and the random stream states. Nothing is pickled.
+# Everything that decides what happens next is saved, including the order
+# things are stored and indexed in, so a restored world continues exactly like
+# the original would have.
+
+# Per-organism attributes of the object engine, in the same terms as population.COLUMNS
+ORGANISM_FIELDS = (
+    ("id", np.int64),
+    ("parent_id", np.int64),
+    ("x", np.float64),
+    ("y", np.float64),
+    ("rotation", np.float64),
+    ("speed", np.float64),
+    ("energy", np.float64),
+    ("age", np.int64),
+    ("lifespan", np.int64),
+    ("gestating", np.bool_),
+    ("gestation_timer", np.int64),
+    ("generation", np.int64),
+)
+
+# Population columns kept for the living organisms of the vector engine
+POPULATION_FIELDS = ("id", "x", "y", "rotation", "speed", "energy", "age", "lifespan", "gestating",
+                     "gestation_timer", "generation", "color", "inputs", "w1", "b1", "w2", "b2")
+
+def save(world, path):
+    if isinstance(world, VectorWorld):
+        arrays, meta = save_vector(world)
+    else:
+        arrays, meta = save_object(world)
+    meta.update(tick=world.tick_count, field=[world.field_w, world.field_h], seed=world.seed, activation=neural_network.ACTIVATION)
+    arrays.update(metric_arrays(world.metrics))
+    arrays["meta"] = np.array(json.dumps(meta))
+
+    # Written next to the old checkpoint first, so a crash while saving never leaves a broken file behind
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+def load(path, engine=None, processes=None):
+    # engine "tiled" restores an array engine checkpoint into a TiledWorld with that many processes
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    meta = json.loads(str(arrays.pop("meta")))
+    engine = engine or meta["engine"]
+    if (engine == "object") != (meta["engine"] == "object"):
+        raise ValueError(f"{path} is a checkpoint of the {meta['engine']} engine, not the {engine} one")
+
+    w, h = meta["field"]
+    if engine == "tiled":
+        from tiled_world import TiledWorld
+        world = TiledWorld(w, h, populate=False, seed=meta["seed"], processes=processes)
+        load_vector(world, arrays, meta)
+    elif engine == "vector":
+        world = VectorWorld(w, h, populate=False, seed=meta["seed"])
+        load_vector(world, arrays, meta)
+    else:
+        world = World(w, h, populate=False, seed=meta["seed"])
+        load_object(world, arrays, meta)
+    world.tick_count = meta["tick"]
+    neural_network.ACTIVATION = meta.get("activation", "exact") # Older checkpoints only had the exact one
+    load_metrics(world.metrics, arrays)
+    return world
+
+# ------------------ Object engine ------------------
+def index_order(index):
+    # Position of every member when iterating the index, members of a cell keep this order when reinserted
+    return {obj: i for i, obj in enumerate(obj for members in index.cells.values() for obj in members)}
+
+def save_object(world):
+    arrays = {}
+    for prefix, organisms, index in (("herb_", world.herbivores, world.herb_index), ("carn_", world.carnivores, world.carn_index)):
+        order = index_order(index)
+        n = len(organisms)
+        for name, dtype in ORGANISM_FIELDS:
+            arrays[prefix + name] = np.array([getattr(o, name) for o in organisms], dtype=dtype)
+        arrays[prefix + "color"] = np.array([o.color for o in organisms], dtype=np.uint8).reshape(n, 3)
+        arrays[prefix + "inputs"] = np.array([o.inputs or [0.0] * 4 for o in organisms], dtype=np.float64).reshape(n, 4)
+        arrays[prefix + "has_inputs"] = np.array([o.inputs is not None for o in organisms], dtype=np.bool_)
+        arrays[prefix + "order"] = np.array([order[o] for o in organisms], dtype=np.int64)
+        hidden = organisms[0].nn.hidden_size if organisms else 0
+        for name, shape in (("w1", (hidden, 4)), ("b1", (hidden,)), ("w2", (2, hidden)), ("b2", (2,))):
+            arrays[prefix + name] = np.array([getattr(o.nn, name) for o in organisms], dtype=np.float64).reshape((n,) + shape)
+
+    # Plants in slot order, plus the order they are queued in for duplicating
+    plants = world.plants
+    order = index_order(world.plant_index)
+    queue = [p.slot for tick in sorted(plants.due) for p in plants.due[tick] if p.slot is not None]
+    arrays.update(
+        plant_id=np.array([p.id for p in plants], dtype=np.int64),
+        plant_x=np.array([p.x for p in plants], dtype=np.float64),
+        plant_y=np.array([p.y for p in plants], dtype=np.float64),
+        plant_size=np.array([p.size for p in plants], dtype=np.float64),
+        plant_color=np.array([p.color for p in plants], dtype=np.uint8).reshape(len(plants), 3),
+        plant_timer=np.array([p.duplication_timer for p in plants], dtype=np.float64),
+        plant_due_tick=np.array([p.due_tick for p in plants], dtype=np.int64),
+        plant_order=np.array([order[p] for p in plants], dtype=np.int64),
+        plant_queue=np.array(queue, dtype=np.int64),
+    )
+
+    streams = world.streams
+    meta = {
+        "engine": "object",
+        "plant_tick": plants.tick,
+        "next_ids": {"herbivore": world.next_ids[Herbivore], "carnivore": world.next_ids[Carnivore], "plant": plants.next_id},
+        "herb_deaths": world.herb_deaths,
+        "carn_deaths": world.carn_deaths,
+        "streams": {name: getattr(streams, name).getstate() for name in ("spawn", "organisms", "brains", "plants")},
+        "births": streams.births.bit_generator.state,
+    }
+    return arrays, meta
+
+def load_object(world, arrays, meta):
+    # Plants
+    plants = world.plants
+    plants.tick = meta["plant_tick"]
+    restored = []
+    for i in range(len(arrays["plant_id"])):
+        plant = Plant.__new__(Plant)
+        plant.id = arrays["plant_id"][i].item()
+        plant.x, plant.y = arrays["plant_x"][i].item(), arrays["plant_y"][i].item()
+        plant.size = arrays["plant_size"][i].item()
+        plant.color = tuple(arrays["plant_color"][i].tolist())
+        plant.rgb = [c / 255 for c in plant.color]
+        plant.duplication_timer = arrays["plant_timer"][i].item()
+        plant.due_tick = arrays["plant_due_tick"][i].item()
+        plant.slot = i
+        restored.append(plant)
+    plants.plants = restored
+    for slot in arrays["plant_queue"].tolist():
+        plant = restored[slot]
+        plants.due.setdefault(plant.due_tick, []).append(plant)
+    for i in np.argsort(arrays["plant_order"]).tolist():
+        world.plant_index.insert(restored[i])
+
+    # Organisms, set slot by slot like World.give_birth does instead of being made at random first
+    for prefix, cls, organisms, index in (("herb_", Herbivore, world.herbivores, world.herb_index),
+                                          ("carn_", Carnivore, world.carnivores, world.carn_index)):
+        for i in range(len(arrays[prefix + "id"])):
+            organism = cls.__new__(cls)
+            organism.streams = world.streams
+            for name, _ in ORGANISM_FIELDS:
+                setattr(organism, name, arrays[prefix + name][i].item())
+            organism.color = tuple(arrays[prefix + "color"][i].tolist())
+            organism.rgb = [c / 255 for c in organism.color]
+            organism.alive = True
+            organism.death_cause = None
+            organism.inputs = arrays[prefix + "inputs"][i].tolist() if arrays[prefix + "has_inputs"][i] else None
+            organism.nn = NeuralNetwork.from_weights(*(array("d", arrays[prefix + name][i].ravel().tolist())
+                                                       for name in ("w1", "b1", "w2", "b2")))
+            # Only shown by the network panel, so redone from the inputs instead of being saved
+            organism.activations = organism.nn.forward(organism.inputs) if organism.inputs is not None else None
+            organisms.append(organism)
+        for i in np.argsort(arrays[prefix + "order"]).tolist():
+            index.insert(organisms[i])
+
+    world.herb_deaths.update(meta["herb_deaths"])
+    world.carn_deaths.update(meta["carn_deaths"])
+
+    # Id counters and random streams
+    world.next_ids[Herbivore] = meta["next_ids"]["herbivore"]
+    world.next_ids[Carnivore] = meta["next_ids"]["carnivore"]
+    plants.next_id = meta["next_ids"]["plant"]
+    for name, state in meta["streams"].items():
+        getattr(world.streams, name).setstate((state[0], tuple(state[1]), state[2]))
+    world.streams.births.bit_generator.state = meta["births"]
+
+# ------------------ Vector engine ------------------
+def save_vector(world):
+    arrays = {}
+    for prefix, pop in (("herb_", world.herbivores), ("carn_", world.carnivores)):
+        idx = pop.living()
+        for name in POPULATION_FIELDS:
+            arrays[prefix + name] = getattr(pop, name)[idx]
+
+    plants = world.plants
+    for name in ("id", "x", "y", "color", "timer"):
+        arrays["plant_" + name] = getattr(plants, name)[:plants.size]
+
+    streams = world.streams
+    meta = {
+        "engine": "vector",
+        "next_ids": {"herbivore": world.herbivores.next_id, "carnivore": world.carnivores.next_id, "plant": plants.next_id},
+        "herb_deaths": {str(cause): count for cause, count in world.herbivores.deaths.items()},
+        "carn_deaths": {str(cause): count for cause, count in world.carnivores.deaths.items()},
+        "streams": {name: getattr(streams, name).bit_generator.state for name in ("spawn", "organisms", "brains", "plants")},
+    }
+    return arrays, meta
+
+def load_vector(world, arrays, meta):
+    for prefix, pop, key in (("herb_", world.herbivores, "herbivore"), ("carn_", world.carnivores, "carnivore")):
+        deaths = meta[prefix + "deaths"]
+        count = len(arrays[prefix + "id"])
+        pop.reserve(count)
+        for name in POPULATION_FIELDS:
+            getattr(pop, name)[:count] = arrays[prefix + name]
+        pop.alive[:count] = True
+        pop.think(np.arange(count), pop.inputs[:count].copy()) # Activations are only for viewers, redone instead of saved
+        pop.death_cause[:count] = 0
+        pop.size = count
+        pop.next_id = meta["next_ids"][key]
+        pop.deaths = {int(cause): n for cause, n in deaths.items()}
+
+    plants = world.plants
+    count = len(arrays["plant_id"])
+    plants.reserve(count)
+    for name in ("id", "x", "y", "color", "timer"):
+        getattr(plants, name)[:count] = arrays["plant_" + name]
+    plants.size = count
+    plants.next_id = meta["next_ids"]["plant"]
+
+    for name, state in meta["streams"].items():
+        getattr(world.streams, name).bit_generator.state = state
+
+# ------------------ Metrics ------------------
+def metric_arrays(metrics):
+    arrays = {name: np.array(value) for name, value in metrics.state().items()}
+    return {"metrics_" + name: value for name, value in arrays.items()}
+
+def load_metrics(metrics, arrays):
+    metrics.set_state({name[len("metrics_"):]: value for name, value in arrays.items() if name.startswith("metrics_")})
@@ -0,0 +1,92 @@
+import json
+import os
+import numpy as np
+
+# ----------------------
+# Metrics export
+# ----------------------
+# Streams one row per tick to disk so a run of any length can be analysed
+# afterwards without keeping its history in memory. Rows are collected in a
+# fixed size buffer and written out in bulk whenever it fills up, either
+# appended to a CSV file (path ending in .csv, fine for small runs) or as one
+# .npy chunk per buffer in a directory (everything else, for long runs).
+
+SPECIES_STATS = ("energy", "generation", "r", "g", "b") # Means over the living organisms of a species
+
+COLUMNS = (
+    "tick",
+    "plants",
+    "herbivores",
+    "carnivores",
+    "herb_starvation",  # Death counts are cumulative
+    "herb_eaten",
+    "herb_old_age",
+    "carn_starvation",
+    "carn_eaten",
+    "carn_old_age",
+) + tuple(f"{prefix}_{stat}" for prefix in ("herb", "carn") for stat in SPECIES_STATS)
+
+# Columns written as floats in CSVs, the rest are counts
+MEAN_COLUMNS = COLUMNS[10:]
+
+# ----------------------
+# MetricsWriter
+# ----------------------
+# Worlds call `add` with a dict of COLUMNS from update_data while a writer is
+# set as their `export`.
+class MetricsWriter:
+    def __init__(self, path, buffer_size=4096):
+        self.path = path
+        self.csv = path.endswith(".csv")
+        self.buffer = np.zeros((buffer_size, len(COLUMNS)), dtype=np.float64)
+        self.count = 0
+        self.chunks = 0
+        self.file = None
+        if self.csv:
+            self.file = open(path, "w")
+            self.file.write(",".join(COLUMNS) + "\n")
+        else:
+            os.makedirs(path, exist_ok=True)
+            for name in os.listdir(path):
+                if name.startswith("chunk_") and name.endswith(".npy"):
+                    os.remove(os.path.join(path, name))
+            with open(os.path.join(path, "columns.json"), "w") as f:
+                json.dump(COLUMNS, f)
+
+    def add(self, row):
+        if self.count == len(self.buffer):
+            self.flush()
+        self.buffer[self.count] = [row[name] for name in COLUMNS]
+        self.count += 1
+
+    def flush(self):
+        if self.count:
+            rows = self.buffer[:self.count]
+            if self.csv:
+                fmt = ["%.6g" if name in MEAN_COLUMNS else "%d" for name in COLUMNS]
+                np.savetxt(self.file, rows, fmt=fmt, delimiter=",")
+            else:
+                np.save(os.path.join(self.path, f"chunk_{self.chunks:06d}.npy"), rows)
+                self.chunks += 1
+            self.count = 0
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def read(path):
+    # Everything a MetricsWriter wrote, as {column: array}
+    if path.endswith(".csv"):
+        rows = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+    else:
+        with open(os.path.join(path, "columns.json")) as f:
+            if tuple(json.load(f)) != COLUMNS:
+                raise ValueError(f"{path} was written with different columns")
+        names = sorted(name for name in os.listdir(path) if name.startswith("chunk_") and name.endswith(".npy"))
+        chunks = [np.load(os.path.join(path, name)) for name in names]
+        rows = np.concatenate(chunks) if chunks else np.zeros((0, len(COLUMNS)))
+    return {name: rows[:, i] for i, name in enumerate(COLUMNS)}
@@ -0,0 +1,44 @@
+import math
+import numpy as np
+
+# ----------------------
+# Graph level of detail
+# ----------------------
+# Helpers that keep the graphs cheap to draw no matter how long the run is.
+
+def decimate(x, y, buckets):
+    # Min/max envelope: every bucket of consecutive points is replaced by its lowest
+    # and highest point, in order, so spikes survive but at most ~2 points per pixel are drawn
+    n = len(x)
+    if buckets <= 0 or n <= 2 * buckets:
+        return x, y
+
+    size = n // buckets
+    used = size * buckets
+    rows = y[:used].reshape(buckets, size)
+    lo, hi = rows.argmin(axis=1), rows.argmax(axis=1)
+    base = np.arange(buckets) * size
+    idx = np.stack([base + np.minimum(lo, hi), base + np.maximum(lo, hi)], axis=1).ravel()
+
+    # Points that didn't fill a whole bucket, and always the newest point
+    if used < n:
+        tail = y[used:]
+        idx = np.concatenate([idx, used + np.unique([tail.argmin(), tail.argmax()]), [n - 1]])
+    return x[idx], y[idx]
+
+def thin(x, y, points):
+    # Every k-th point plus the newest one, for curves where an envelope makes no sense (the phase plot)
+    n = len(x)
+    if points <= 0 or n <= points:
+        return x, y
+    idx = np.append(np.arange(0, n, n // points), n - 1)
+    return x[idx], y[idx]
+
+def nice_ceil(value):
+    # Smallest 1, 2 or 5 times a power of ten that is at least value
+    if value <= 0:
+        return 1
+    power = 10 ** math.floor(math.log10(value))
+    for m in (1, 2, 5, 10):
+        if m * power >= value:
+            return m * power
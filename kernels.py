@@ -0,0 +1,104 @@
+import numpy as np
+from variables import *
+
+try:
+    from numba import njit # type: ignore
+except ImportError:
+    njit = None
+
+# ----------------------
+# Compiled kernels
+# ----------------------
+# The loops of the array engine that can't be written as whole-array NumPy
+# operations, as plain loops over arrays. With numba installed they're
+# compiled and used instead of the NumPy/Python reference code in vision.py
+# and vector_world.py; without it the reference code runs. Both paths give
+# exactly the same results, which `python kernels.py` and tests/test_kernels.py
+# check on a seeded world.
+
+# Checked on every call, so the kernels can be switched on and off at runtime
+ENABLED = SYS_JIT and njit is not None
+
+def compiled(function):
+    # Left as a plain (slow) Python function when numba isn't installed, so the kernels can still be checked
+    return njit(cache=True, nogil=True)(function) if njit is not None else function
+
+@compiled
+def cell_pairs(ocx, ocy, cell_start, order, cols, rows):
+    # The (observer, target) pairs of vision.candidate_pairs, in the same order: by neighbor
+    # offset, then observer, then target. cell_start[c]:cell_start[c + 1] is cell c's run in order
+    n = len(ocx)
+    total = 0
+    for dx in range(-1, 2):
+        for dy in range(-1, 2):
+            for i in range(n):
+                cell = (ocy[i] + dy) % rows * cols + (ocx[i] + dx) % cols
+                total += cell_start[cell + 1] - cell_start[cell]
+
+    obs = np.empty(total, dtype=np.int64)
+    tgt = np.empty(total, dtype=np.int64)
+    k = 0
+    for dx in range(-1, 2):
+        for dy in range(-1, 2):
+            for i in range(n):
+                cell = (ocy[i] + dy) % rows * cols + (ocx[i] + dx) % cols
+                for j in range(cell_start[cell], cell_start[cell + 1]):
+                    obs[k] = i
+                    tgt[k] = order[j]
+                    k += 1
+    return obs, tgt
+
+@compiled
+def first_claims(tgt, count):
+    # Whether each pair is the first to claim its target, going through the pairs in order
+    claimed = np.zeros(count, dtype=np.bool_)
+    first = np.zeros(len(tgt), dtype=np.bool_)
+    for k in range(len(tgt)):
+        t = tgt[k]
+        if not claimed[t]:
+            claimed[t] = True
+            first[k] = True
+    return first
+
+def check(ticks, seed, size):
+    # Runs a seeded VectorWorld with and without the kernels and compares every event and the
+    # final state of every organism and plant. Returns (whether they match, ticks run)
+    import kernels # This module as vision.py sees it, also when run as a script
+    from vector_world import VectorWorld
+    from replay import ReplayLog
+    from checkpoint import save_vector
+
+    runs = []
+    saved = kernels.ENABLED
+    try:
+        for enabled in (False, True):
+            kernels.ENABLED = enabled
+            world = VectorWorld(*size, seed=seed)
+            world.events = ReplayLog()
+            while world.tick_count < ticks and not world.is_over():
+                world.step()
+            runs.append((world.events.events(), save_vector(world)[0]))
+    finally:
+        kernels.ENABLED = saved
+    (reference, reference_state), (kernel, kernel_state) = runs
+    same = len(reference) == len(kernel) and np.array_equal(reference, kernel)
+    same = same and reference_state.keys() == kernel_state.keys()
+    same = same and all(np.array_equal(reference_state[name], kernel_state[name]) for name in reference_state)
+    return same, world.tick_count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check that the compiled kernels give the same results as the reference code")
+    parser.add_argument("--ticks", type=int, default=200, help="Ticks to compare")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the compared world")
+    parser.add_argument("--size", type=int, nargs=2, default=[SYS_FIELD_WIDTH, SYS_FIELD_HEIGHT], metavar=("W", "H"), help="Field width and height")
+    args = parser.parse_args()
+
+    if njit is None:
+        print("numba isn't installed, checking the kernels as plain Python (slow)")
+    same, ran = check(args.ticks, args.seed, args.size)
+    print(f"{ran} ticks: {'identical' if same else 'DIFFERENT'}")
+    if not same:
+        raise SystemExit(1)
@@ -0,0 +1,183 @@
+import numpy as np
+from replay import BIRTH, DEATH, EAT, SPECIES, read_chunks
+from population import DEATH_CAUSES
+
+# ----------------------
+# Lineage
+# ----------------------
+# Family trees built from replay log events (see replay.py). Ids are handed
+# out in order per species, so everything is kept in arrays indexed by id that
+# grow as needed: 41 bytes per id handed out, plus 16 once descendants are
+# asked for, so about 57MB per million organisms. That is kept in memory on
+# purpose rather than looked up in the log, queries never touch the disk.
+# Organisms that were spawned rather than born have parent 0 and no color, and
+# are only known once they show up in an event. A Lineage can
+# be fed live by passing it to ReplayLog(lineage=...) or loaded from a log
+# file afterwards with `load`.
+class Lineage:
+    def __init__(self, capacity=1024):
+        self.families = {code: Family(capacity) for code in SPECIES.values()}
+
+    def add(self, events):
+        for code, family in self.families.items():
+            mine = events[events["species"] == code]
+            if len(mine):
+                family.add(mine)
+
+    def family(self, species):
+        return self.families[SPECIES[species]]
+
+    # ------------------ Queries ------------------
+    def parent(self, species, id):
+        return self.family(species).parent_of(id)
+
+    def children_count(self, species, id):
+        return self.family(species).count_children(id)
+
+    def children(self, species, id):
+        return self.family(species).children_of(id)
+
+    def ancestors(self, species, id):
+        # Parent first, back to an organism that was spawned
+        return self.family(species).ancestors_of(id)
+
+    def descendants(self, species, id):
+        return self.family(species).descendants_of(id)
+
+    def summary(self, species, id):
+        family = self.family(species)
+        if not family.known(id):
+            return None
+        cause = int(family.death_cause[id])
+        return {
+            "parent": int(family.parent[id]),
+            "born": int(family.born[id]),          # -1 for spawned organisms
+            "color": tuple(int(c) for c in family.color[id]) if family.born[id] >= 0 else None, # None for spawned organisms
+            "children": int(family.children[id]),
+            "meals": int(family.meals[id]),
+            "died": int(family.died[id]),          # -1 while alive
+            "cause": DEATH_CAUSES.get(cause),
+            "age": int(family.age[id]),
+            "energy": float(family.energy[id]),
+        }
+
+# ----------------------
+# Family
+# ----------------------
+# Per-organism arrays of one species, slot i belonging to the organism with id i
+class Family:
+    def __init__(self, capacity):
+        self.seen = np.zeros(capacity, dtype=bool) # Ids that were in an event, the arrays are larger than that
+        self.parent = np.zeros(capacity, dtype=np.int64)
+        self.born = np.full(capacity, -1, dtype=np.int32)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.children = np.zeros(capacity, dtype=np.int32)
+        self.meals = np.zeros(capacity, dtype=np.int32)
+        self.died = np.full(capacity, -1, dtype=np.int32)
+        self.death_cause = np.zeros(capacity, dtype=np.int8)
+        self.age = np.zeros(capacity, dtype=np.int32)
+        self.energy = np.zeros(capacity, dtype=np.float64)
+        self.order = None # Ids sorted by parent, built when descendants are first asked for
+
+    def reserve(self, max_id):
+        if max_id < len(self.parent):
+            return
+        capacity = max(max_id + 1, 2 * len(self.parent))
+        for name in ("seen", "parent", "born", "color", "children", "meals", "died", "death_cause", "age", "energy"):
+            old = getattr(self, name)
+            fill = -1 if name in ("born", "died") else 0
+            new = np.full((capacity,) + old.shape[1:], fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add(self, events):
+        self.reserve(int(events["id"].max()))
+        self.seen[events["id"]] = True
+
+        births = events[events["kind"] == BIRTH]
+        if len(births):
+            ids = births["id"]
+            self.seen[births["other"]] = True
+            self.parent[ids] = births["other"]
+            self.born[ids] = births["tick"]
+            self.color[ids] = births["color"]
+            np.add.at(self.children, births["other"], 1)
+            self.order = None
+
+        deaths = events[events["kind"] == DEATH]
+        ids = deaths["id"]
+        self.died[ids] = deaths["tick"]
+        self.death_cause[ids] = deaths["cause"]
+        self.age[ids] = deaths["age"]
+        self.energy[ids] = deaths["energy"]
+
+        np.add.at(self.meals, events["id"][events["kind"] == EAT], 1)
+
+    # ------------------ Queries ------------------
+    def known(self, id):
+        return 0 < id < len(self.parent) and bool(self.seen[id])
+
+    def parent_of(self, id):
+        return int(self.parent[id]) if self.known(id) else 0
+
+    def count_children(self, id):
+        return int(self.children[id]) if self.known(id) else 0
+
+    def ancestors_of(self, id):
+        ancestors = []
+        while self.known(id) and self.parent[id]:
+            id = int(self.parent[id])
+            ancestors.append(id)
+        return ancestors
+
+    def children_of(self, id):
+        if not self.known(id):
+            return np.zeros(0, dtype=np.int64)
+        return self.children_of_many(np.array([id]))
+
+    def children_of_many(self, ids):
+        if self.order is None:
+            # Ids grouped by parent, so every organism's children are one slice
+            self.order = np.argsort(self.parent, kind="stable")
+            self.sorted_parent = self.parent[self.order]
+        ids = ids[self.children[ids] > 0]
+        counts = self.children[ids]
+        starts = np.searchsorted(self.sorted_parent, ids)
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return self.order[offsets]
+
+    def descendants_of(self, id):
+        # Children, then grandchildren and so on, one generation at a time
+        found = []
+        generation = self.children_of(id)
+        while len(generation):
+            found.append(generation)
+            generation = self.children_of_many(generation)
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+def load(path):
+    # A Lineage of a whole replay log file, read a block at a time
+    lineage = Lineage()
+    for events in read_chunks(path):
+        lineage.add(events)
+    return lineage
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Look up an organism's family in a replay log (world.py --replay)")
+    parser.add_argument("log", help="Replay log to read")
+    parser.add_argument("species", choices=list(SPECIES), help="Species of the organism")
+    parser.add_argument("id", type=int, help="Id of the organism, as shown in the GUI's info panel")
+    args = parser.parse_args()
+
+    lineage = load(args.log)
+    info = lineage.summary(args.species, args.id)
+    if info is None:
+        parser.error(f"No {args.species} with id {args.id} in {args.log}")
+    for name, value in info.items():
+        print(f"{name}: {value}")
+    ancestors = lineage.ancestors(args.species, args.id)
+    print(f"ancestors: {len(ancestors)} {ancestors[:10]}{' ...' if len(ancestors) > 10 else ''}")
+    print(f"descendants: {len(lineage.descendants(args.species, args.id))}")
@@ -0,0 +1,136 @@
+from collections import deque
+import numpy as np
+from variables import *
+
+# Columns recorded every tick. The death columns are cumulative herbivore death counts
+# and the percentage columns are their shares over the last SYS_DEATH_WINDOW_SIZE ticks
+COLUMNS = (
+    "tick",
+    "plants",
+    "herbivores",
+    "carnivores",
+    "starvation",
+    "eaten",
+    "old_age",
+    "pct_starvation",
+    "pct_eaten",
+    "pct_old_age",
+)
+DEATH_COLUMNS = ("starvation", "eaten", "old_age")
+
+# Columns whose maximum over the visible history is tracked for the graph limits
+MAX_COLUMNS = ("plants", "herbivores", "carnivores")
+
+# ----------------------
+# Metrics
+# ----------------------
+# Per-tick history for the graphs, keeping the last `memory` ticks. Ticks are
+# appended to a buffer twice that long, and when it fills up the last `memory`
+# ticks move to the front of a new one, so the visible history is always one
+# contiguous slice and series() never copies. A slot is never written again
+# once filled, which lets copy() share the buffer instead of duplicating it.
+# Window sums and maximums are updated as ticks come in instead of being
+# recomputed over the history.
+class Metrics:
+    def __init__(self, memory=SYS_GRAPH_MEMORY, window=SYS_DEATH_WINDOW_SIZE):
+        self.memory = memory
+        self.window = window
+        self.count = 0
+        self.base = 0 # Tick count at data[:, 0]
+        self.data = np.zeros((len(COLUMNS), 2 * memory), dtype=np.float64)
+        self.column = {name: i for i, name in enumerate(COLUMNS)}
+
+        # Sliding window sums of the death columns
+        self.recent = {name: deque(maxlen=window + 1) for name in DEATH_COLUMNS}
+        self.window_sums = {name: 0 for name in DEATH_COLUMNS}
+
+        # Monotonic queues of (count, value), largest first, for the sliding maximums
+        self.maxima = {name: deque() for name in MAX_COLUMNS}
+
+    def __len__(self):
+        return min(self.count, self.memory)
+
+    def add(self, tick, plants, herbivores, carnivores, starvation, eaten, old_age):
+        row = {
+            "tick": tick,
+            "plants": plants,
+            "herbivores": herbivores,
+            "carnivores": carnivores,
+            "starvation": starvation,
+            "eaten": eaten,
+            "old_age": old_age,
+        }
+
+        # Death cause percentages
+        for name in DEATH_COLUMNS:
+            recent = self.recent[name]
+            if len(recent) == recent.maxlen:
+                self.window_sums[name] -= recent[0]
+            recent.append(row[name])
+            self.window_sums[name] += row[name]
+        total = sum(self.window_sums.values())
+        for name in DEATH_COLUMNS:
+            row["pct_" + name] = self.window_sums[name] / total * 100 if total > 0 else 0
+
+        # Maximums
+        for name in MAX_COLUMNS:
+            maxima = self.maxima[name]
+            while maxima and maxima[-1][1] <= row[name]:
+                maxima.pop()
+            maxima.append((self.count, row[name]))
+            while maxima[0][0] <= self.count - self.memory:
+                maxima.popleft()
+
+        pos = self.count - self.base
+        if pos == self.data.shape[1]:
+            # A new buffer rather than shifting this one, copies may still be reading it
+            data = np.zeros_like(self.data)
+            data[:, :self.memory] = self.data[:, -self.memory:]
+            self.data = data
+            self.base += pos - self.memory
+            pos = self.memory
+        for name, value in row.items():
+            self.data[self.column[name], pos] = value
+        self.count += 1
+
+    def copy(self):
+        # Independent copy, so another thread can keep adding ticks to the original. The history
+        # buffer is shared, the original only appends past this copy's count or moves to a new one
+        other = Metrics.__new__(Metrics)
+        other.__dict__.update(self.__dict__)
+        other.recent = {name: deque(recent, maxlen=recent.maxlen) for name, recent in self.recent.items()}
+        other.window_sums = dict(self.window_sums)
+        other.maxima = {name: deque(maxima) for name, maxima in self.maxima.items()}
+        return other
+
+    def state(self):
+        # The visible history and the window and maximum queues as arrays, for checkpoint.py
+        state = {"count": self.count, "history": np.stack([self.series(name) for name in COLUMNS])}
+        for name in DEATH_COLUMNS:
+            state["recent_" + name] = np.array(self.recent[name], dtype=np.int64)
+        for name in MAX_COLUMNS:
+            state["maxima_" + name] = np.array(self.maxima[name], dtype=np.float64).reshape(-1, 2)
+        return state
+
+    def set_state(self, state):
+        self.count = int(state["count"])
+        history = state["history"][:, -self.memory:]
+        self.base = self.count - history.shape[1]
+        self.data[:, :history.shape[1]] = history
+        for name in DEATH_COLUMNS:
+            self.recent[name].extend(int(v) for v in state["recent_" + name])
+            self.window_sums[name] = sum(self.recent[name])
+        for name in MAX_COLUMNS:
+            self.maxima[name].extend((int(c), v) for c, v in state["maxima_" + name].tolist())
+
+    def series(self, name):
+        # The visible history of one column, oldest first
+        end = self.count - self.base
+        return self.data[self.column[name], end - len(self):end]
+
+    def last(self, name):
+        return self.data[self.column[name], self.count - self.base - 1]
+
+    def max(self, name):
+        maxima = self.maxima[name]
+        return maxima[0][1] if maxima else 0
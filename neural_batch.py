@@ -0,0 +1,35 @@
+import numpy as np
+from variables import *
+import neural_network
+
+# ----------------------
+# Batched neural networks
+# ----------------------
+# The same network as neural_network.NeuralNetwork, but with the weights of a
+# whole population stacked along the first axis:
+#   w1: (n, hidden, inputs)   b1: (n, hidden)
+#   w2: (n, outputs, hidden)  b2: (n, outputs)
+
+def random_weights(rng, count, input_size, hidden_size, output_size):
+    return (
+        rng.uniform(-1, 1, size=(count, hidden_size, input_size)),
+        rng.uniform(-1, 1, size=(count, hidden_size)),
+        rng.uniform(-1, 1, size=(count, output_size, hidden_size)),
+        rng.uniform(-1, 1, size=(count, output_size)),
+    )
+
+def mutate(rng, w1, b1, w2, b2):
+    # Copies of the given rows with every weight fluctuated by up to NN_MUTATION_RATE
+    return tuple(w + rng.uniform(-NN_MUTATION_RATE, NN_MUTATION_RATE, size=w.shape) for w in (w1, b1, w2, b2))
+
+def forward(w1, b1, w2, b2, inputs):
+    # inputs: (n, inputs) -> (hidden, outputs): (n, hidden) activations and (n, outputs) in [-1, 1],
+    # with the activation neural_network.ACTIVATION picks
+    hidden = np.matmul(w1, inputs[:, :, None])[:, :, 0] + b1
+    if neural_network.ACTIVATION == "fast":
+        hidden = 0.5 + 0.5 * hidden / (2 + np.abs(hidden))
+        outputs = np.matmul(w2, hidden[:, :, None])[:, :, 0] + b2
+        return hidden, outputs / (2 + np.abs(outputs))
+    hidden = 1 / (1 + np.exp(-hidden))
+    outputs = np.matmul(w2, hidden[:, :, None])[:, :, 0] + b2
+    return hidden, 1 / (1 + np.exp(-outputs)) * 2 - 1
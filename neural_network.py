@@ -1,29 +1,75 @@
 import random
+from array import array
+from math import exp
+import numpy as np
 from variables import *
 
+# Activation of every neuron, checked on every forward pass so it can be switched at runtime:
+#   "exact": sigmoid 1 / (1 + e^-x), outputs mapped to [-1, 1] as 2 * sigmoid - 1
+#   "fast":  0.5 + 0.5 * x / (2 + |x|), the same shape and slope at 0 without an exp
+# Both engines and the network panel use it, see also neural_batch.forward
+ACTIVATION = NN_ACTIVATION
+ACTIVATIONS = ("exact", "fast")
+
+# Weights are kept as flat arrays of doubles, row by row: w1[j * input_size + i]
+# is the weight from input i to hidden neuron j, w2[k * hidden_size + j] the one
+# from hidden neuron j to output k
 class NeuralNetwork:
-    def __init__(self, input_size, hidden_size, output_size, w1=None, b1=None, w2=None, b2=None):
-        if w1 and b1 and w2 and b2:
-            self.w1 = [[w + random.uniform(-NN_MUTATION_RATE, NN_MUTATION_RATE) for w in row] for row in w1]
-            self.b1 = [b + random.uniform(-NN_MUTATION_RATE, NN_MUTATION_RATE) for b in b1]
-            self.w2 = [[w + random.uniform(-NN_MUTATION_RATE, NN_MUTATION_RATE) for w in row] for row in w2]
-            self.b2 = [b + random.uniform(-NN_MUTATION_RATE, NN_MUTATION_RATE) for b in b2]
-        else:
-            self.w1 = [[random.uniform(-1, 1) for _ in range(input_size)] for _ in range(hidden_size)]
-            self.b1 = [random.uniform(-1, 1) for _ in range(hidden_size)]
-            self.w2 = [[random.uniform(-1, 1) for _ in range(hidden_size)] for _ in range(output_size)]
-            self.b2 = [random.uniform(-1, 1) for _ in range(output_size)]
-
-    def activate(self, x):
-        return 1 / (1 + math.exp(-x))
+    __slots__ = ("w1", "b1", "w2", "b2")
+
+    def __init__(self, input_size, hidden_size, output_size, rng=random):
+        self.w1 = array("d", [rng.uniform(-1, 1) for _ in range(hidden_size * input_size)])
+        self.b1 = array("d", [rng.uniform(-1, 1) for _ in range(hidden_size)])
+        self.w2 = array("d", [rng.uniform(-1, 1) for _ in range(output_size * hidden_size)])
+        self.b2 = array("d", [rng.uniform(-1, 1) for _ in range(output_size)])
+
+    @classmethod
+    def from_weights(cls, w1, b1, w2, b2):
+        nn = cls.__new__(cls)
+        nn.w1, nn.b1, nn.w2, nn.b2 = w1, b1, w2, b2
+        return nn
+
+    @property
+    def input_size(self):
+        return len(self.w1) // len(self.b1)
+
+    @property
+    def hidden_size(self):
+        return len(self.b1)
 
     def forward(self, inputs):
+        # Returns (hidden, outputs), the hidden layer's activations and the outputs in [-1, 1].
+        # Both layers in one pass straight over the flat weights, without slices or generators.
+        # The two small lists are new every call: writing into scratch lists kept on the network
+        # measured no faster, and the worker and the network panel both call this on the same network
+        w1, w2 = self.w1, self.w2
+        fast = ACTIVATION == "fast"
         hidden = []
-        for i in range(len(self.w1)):
-            val = sum(w * inp for w, inp in zip(self.w1[i], inputs)) + self.b1[i]
-            hidden.append(self.activate(val))
+        k = 0
+        for b in self.b1:
+            val = 0
+            for x in inputs:
+                val += w1[k] * x
+                k += 1
+            val += b
+            hidden.append(0.5 + 0.5 * val / (2 + abs(val)) if fast else 1 / (1 + exp(-val)))
         outputs = []
-        for i in range(len(self.w2)):
-            val = sum(w * h for w, h in zip(self.w2[i], hidden)) + self.b2[i]
-            outputs.append(self.activate(val) * 2 - 1)
-        return outputs
+        k = 0
+        for b in self.b2:
+            val = 0
+            for h in hidden:
+                val += w2[k] * h
+                k += 1
+            val += b
+            outputs.append(val / (2 + abs(val)) if fast else 1 / (1 + exp(-val)) * 2 - 1)
+        return hidden, outputs
+
+def mutated(networks, rng):
+    # The weights of a child of every network, each weight nudged by up to NN_MUTATION_RATE.
+    # Drawn for all of them at once from a NumPy Generator, returns (w1, b1, w2, b2) per child
+    layers = []
+    for name in ("w1", "b1", "w2", "b2"):
+        weights = np.stack([np.frombuffer(getattr(nn, name)) for nn in networks])
+        weights += rng.uniform(-NN_MUTATION_RATE, NN_MUTATION_RATE, size=weights.shape)
+        layers.append([array("d", row.tobytes()) for row in weights])
+    return list(zip(*layers))
@@ -5,53 +5,95 @@ from variables import *
 # Plant
 # ----------------------
 class Plant:
-    _id_counter = 1
+    __slots__ = ("id", "x", "y", "size", "color", "rgb", "duplication_timer", "slot", "due_tick")
 
-    def __init__(self, canvas, x, y, size=PLANT_SIZE):
-        self.id = Plant._id_counter
-        Plant._id_counter += 1
+    def __init__(self, x, y, size=PLANT_SIZE, rng=random):
+        self.id = 0 # Handed out by the PlantSet it's added to
         self.x, self.y, self.size = x, y, size
         self.color = (
-            random.randint(PLANT_START_COLOR_R_0, PLANT_START_COLOR_R_1), 
-            random.randint(PLANT_START_COLOR_G_0, PLANT_START_COLOR_G_1), 
-            random.randint(PLANT_START_COLOR_B_0, PLANT_START_COLOR_B_1), 
+            rng.randint(PLANT_START_COLOR_R_0, PLANT_START_COLOR_R_1),
+            rng.randint(PLANT_START_COLOR_G_0, PLANT_START_COLOR_G_1),
+            rng.randint(PLANT_START_COLOR_B_0, PLANT_START_COLOR_B_1),
         )
-        hex_color = f'#{self.color[0]:02x}{self.color[1]:02x}{self.color[2]:02x}'
-        self.shape = canvas.create_rectangle(
-            x - self.size//2, y - self.size//2, x + self.size//2, y + self.size//2,
-            fill=hex_color, outline=""
-        )
-        self.duplication_timer = random.randint(PLANT_REPRODUCTION_START_FRAME_MIN, PLANT_REPRODUCTION_START_FRAME_MAX)
-
-    def remove(self, canvas):
-        canvas.delete(self.shape)
-
-    def try_duplicate(self, canvas, plants, world_w, world_h):
-        self.duplication_timer -= 1
-        if self.duplication_timer <= 0:
-            duplication_timer_mul = 16 * math.exp(-0.000770689 * len(plants))
-            self.duplication_timer = random.randint(PLANT_REPRODUCTION_FRAME_MIN, PLANT_REPRODUCTION_FRAME_MAX) / duplication_timer_mul
-
-            for _ in range(PLANT_SPREAD_TRY_NUM):
-                new_x = (self.x + random.randint(-PLANT_SPREAD_MAX, PLANT_SPREAD_MAX)) % world_w
-                new_y = (self.y + random.randint(-PLANT_SPREAD_MAX, PLANT_SPREAD_MAX)) % world_h
-
-                too_close = False
-                for p in plants:
-                    dx = new_x - p.x
-                    dy = new_y - p.y
-                    if dx*dx + dy*dy < PLANT_SPREAD_MIN*PLANT_SPREAD_MIN:
-                        too_close = True
-                        break
-
-                if not too_close:
-                    r = min(max(self.color[0] + random.randint(-PLANT_COLOR_MUTATE_RAND, PLANT_COLOR_MUTATE_RAND), 0), 255)
-                    g = min(max(self.color[1] + random.randint(-PLANT_COLOR_MUTATE_RAND, PLANT_COLOR_MUTATE_RAND), 0), 255)
-                    b = min(max(self.color[2] + random.randint(-PLANT_COLOR_MUTATE_RAND, PLANT_COLOR_MUTATE_RAND), 0), 255)
-
-                    child = Plant(canvas, new_x, new_y, self.size)
-                    child.color = (r, g, b)
-                    child.duplication_timer = self.duplication_timer
-                    canvas.itemconfig(child.shape, fill=f'#{r:02x}{g:02x}{b:02x}')
-                    plants.append(child)
-                    return # Successfully reproduced
+        self.rgb = [c / 255 for c in self.color]
+        self.duplication_timer = rng.randint(PLANT_REPRODUCTION_START_FRAME_MIN, PLANT_REPRODUCTION_START_FRAME_MAX)
+        self.slot = None
+        self.due_tick = 0
+
+    def duplicate(self, plants, plant_index, world_w, world_h, rng=random):
+        # Called by PlantSet on the tick this plant's duplication timer runs out
+        duplication_timer_mul = 16 * math.exp(-0.000770689 * len(plants))
+        self.duplication_timer = rng.randint(PLANT_REPRODUCTION_FRAME_MIN, PLANT_REPRODUCTION_FRAME_MAX) / duplication_timer_mul
+        plants.schedule(self)
+
+        for _ in range(PLANT_SPREAD_TRY_NUM):
+            new_x = (self.x + rng.randint(-PLANT_SPREAD_MAX, PLANT_SPREAD_MAX)) % world_w
+            new_y = (self.y + rng.randint(-PLANT_SPREAD_MAX, PLANT_SPREAD_MAX)) % world_h
+
+            # Only plants in the surrounding cells can be within PLANT_SPREAD_MIN
+            too_close = False
+            for p in plant_index.nearby(new_x, new_y):
+                dx, dy = plant_index.offset(new_x, new_y, p.x, p.y)
+                if dx*dx + dy*dy < PLANT_SPREAD_MIN*PLANT_SPREAD_MIN:
+                    too_close = True
+                    break
+
+            if not too_close:
+                r = min(max(self.color[0] + rng.randint(-PLANT_COLOR_MUTATE_RAND, PLANT_COLOR_MUTATE_RAND), 0), 255)
+                g = min(max(self.color[1] + rng.randint(-PLANT_COLOR_MUTATE_RAND, PLANT_COLOR_MUTATE_RAND), 0), 255)
+                b = min(max(self.color[2] + rng.randint(-PLANT_COLOR_MUTATE_RAND, PLANT_COLOR_MUTATE_RAND), 0), 255)
+
+                child = Plant(new_x, new_y, self.size, rng)
+                child.color = (r, g, b)
+                child.rgb = [r / 255, g / 255, b / 255]
+                child.duplication_timer = self.duplication_timer
+                plants.add(child)
+                plant_index.insert(child)
+                return # Successfully reproduced
+
+# ----------------------
+# PlantSet
+# ----------------------
+# Every plant in a world. Removing a plant moves the last plant into its slot,
+# so eating is O(1), and plants are bucketed by the tick their duplication
+# timer runs out, so each tick only visits the plants that are due. Plants
+# get their ids when they're added, numbered per set like PlantStore does.
+class PlantSet:
+    def __init__(self):
+        self.next_id = 1
+        self.plants = []
+        self.tick = 0
+        self.due = {}
+
+    def __len__(self):
+        return len(self.plants)
+
+    def __iter__(self):
+        return iter(self.plants)
+
+    def __contains__(self, plant):
+        return plant.slot is not None and self.plants[plant.slot] is plant
+
+    def add(self, plant):
+        plant.id = self.next_id
+        self.next_id += 1
+        plant.slot = len(self.plants)
+        self.plants.append(plant)
+        self.schedule(plant)
+
+    def remove(self, plant):
+        last = self.plants.pop()
+        if last is not plant:
+            self.plants[plant.slot] = last
+            last.slot = plant.slot
+        plant.slot = None
+
+    def schedule(self, plant):
+        # A timer of t fires on the ceil(t)-th tick from now, and never on the current one
+        plant.due_tick = self.tick + max(1, math.ceil(plant.duplication_timer))
+        self.due.setdefault(plant.due_tick, []).append(plant)
+
+    def advance(self):
+        # Moves to the next tick and returns the plants whose timers ran out on it
+        self.tick += 1
+        return [p for p in self.due.pop(self.tick, ()) if p.slot is not None]
@@ -0,0 +1,129 @@
+import numpy as np
+from variables import *
+import vision
+
+# Name, dtype and trailing shape of every per-plant array
+COLUMNS = (
+    ("id", np.int64, ()),
+    ("x", np.float64, ()),
+    ("y", np.float64, ()),
+    ("color", np.uint8, (3,)),
+    ("timer", np.float64, ()),
+)
+
+# ----------------------
+# PlantStore
+# ----------------------
+# Array counterpart of plant.PlantSet for the vector engine. Plants occupy
+# slots [0, size); removing plants moves plants from the end into the freed
+# slots, and duplication timers tick down for the whole store at once.
+class PlantStore:
+    def __init__(self, capacity=2048):
+        self.size = 0
+        self.next_id = 1
+        for name, dtype, shape in COLUMNS:
+            setattr(self, name, np.zeros((capacity,) + shape, dtype=dtype))
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self.x)
+
+    # ------------------ Storage ------------------
+    def reserve(self, count):
+        needed = self.size + count
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2)
+        for name, dtype, shape in COLUMNS:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + shape, dtype=dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def add(self, x, y, color, timer):
+        count = len(x)
+        self.reserve(count)
+        s = slice(self.size, self.size + count)
+        self.id[s] = np.arange(self.next_id, self.next_id + count)
+        self.next_id += count
+        self.x[s], self.y[s] = x, y
+        self.color[s] = color
+        self.timer[s] = timer
+        self.size += count
+
+    def remove(self, idx):
+        # Fill the removed slots with the surviving plants from the end of the store
+        idx = np.unique(idx)
+        size = self.size - len(idx)
+        holes = idx[idx < size]
+        tail = np.setdiff1d(np.arange(size, self.size), idx, assume_unique=True)
+        for name, dtype, shape in COLUMNS:
+            arr = getattr(self, name)
+            arr[holes] = arr[tail]
+        self.size = size
+
+    # ------------------ Spawning ------------------
+    def spawn_random(self, count, streams, field_w, field_h):
+        # Positions come from the spawn stream, everything else from the plants one
+        x = streams.spawn.integers(20, field_w - 20 + 1, size=count).astype(np.float64)
+        y = streams.spawn.integers(20, field_h - 20 + 1, size=count).astype(np.float64)
+        rng = streams.plants
+        color = np.stack([
+            rng.integers(PLANT_START_COLOR_R_0, PLANT_START_COLOR_R_1 + 1, size=count),
+            rng.integers(PLANT_START_COLOR_G_0, PLANT_START_COLOR_G_1 + 1, size=count),
+            rng.integers(PLANT_START_COLOR_B_0, PLANT_START_COLOR_B_1 + 1, size=count),
+        ], axis=1)
+        self.add(
+            x=x,
+            y=y,
+            color=color,
+            timer=rng.integers(PLANT_REPRODUCTION_START_FRAME_MIN, PLANT_REPRODUCTION_START_FRAME_MAX + 1, size=count),
+        )
+
+    def duplicate(self, rng, field_w, field_h):
+        # Every plant whose timer runs out this tick tries to spawn a child next to it
+        n = self.size
+        self.timer[:n] -= 1
+        due = np.flatnonzero(self.timer[:n] <= 0)
+        if len(due) == 0:
+            return
+
+        duplication_timer_mul = 16 * math.exp(-0.000770689 * n)
+        self.timer[due] = rng.integers(PLANT_REPRODUCTION_FRAME_MIN, PLANT_REPRODUCTION_FRAME_MAX + 1, size=len(due)) / duplication_timer_mul
+
+        for _ in range(PLANT_SPREAD_TRY_NUM):
+            if len(due) == 0:
+                return
+            new_x = (self.x[due] + rng.integers(-PLANT_SPREAD_MAX, PLANT_SPREAD_MAX + 1, size=len(due))) % field_w
+            new_y = (self.y[due] + rng.integers(-PLANT_SPREAD_MAX, PLANT_SPREAD_MAX + 1, size=len(due))) % field_h
+
+            too_close = crowded(new_x, new_y, self.x[:self.size], self.y[:self.size], field_w, field_h)
+            ok = ~too_close
+            parents = due[ok]
+            mutate = rng.integers(-PLANT_COLOR_MUTATE_RAND, PLANT_COLOR_MUTATE_RAND + 1, size=(len(parents), 3))
+            self.add(
+                x=new_x[ok],
+                y=new_y[ok],
+                color=np.clip(self.color[parents].astype(np.int64) + mutate, 0, 255),
+                timer=self.timer[parents],
+            )
+            due = due[too_close]
+
+def crowded(new_x, new_y, x, y, field_w, field_h):
+    # Whether each new plant would be within PLANT_SPREAD_MIN of an existing plant, or of a new
+    # one before it that was placed, the same as placing them one at a time
+    too_close = np.zeros(len(new_x), dtype=bool)
+    obs, _ = vision.contacts(new_x, new_y, x, y, PLANT_SPREAD_MIN, field_w, field_h)
+    too_close[obs] = True
+
+    # Pairs within the batch are rare, so they're resolved in order one by one. A new plant's
+    # earlier neighbors are all settled by the time it's reached
+    obs, tgt = vision.contacts(new_x, new_y, new_x, new_y, PLANT_SPREAD_MIN, field_w, field_h)
+    pairs = (tgt < obs) & ~too_close[obs] & ~too_close[tgt]
+    for i, j in sorted(zip(obs[pairs].tolist(), tgt[pairs].tolist())):
+        if not too_close[j]:
+            too_close[i] = True
+    return too_close
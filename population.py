@@ -0,0 +1,222 @@
+import numpy as np
+from variables import *
+import neural_batch
+
+# Death causes, stored per slot as small integers
+STARVATION = 1
+EATEN = 2
+OLD_AGE = 3
+DEATH_CAUSES = {STARVATION: "starvation", EATEN: "eaten", OLD_AGE: "old_age"}
+
+# Neural network sizes
+NN_INPUT_SIZE = 4
+NN_OUTPUT_SIZE = 2
+
+# Name, dtype and trailing shape of every per-organism array
+COLUMNS = (
+    ("id", np.int64, ()),
+    ("x", np.float64, ()),
+    ("y", np.float64, ()),
+    ("rotation", np.float64, ()),
+    ("speed", np.float64, ()),
+    ("energy", np.float64, ()),
+    ("age", np.int64, ()),
+    ("lifespan", np.int64, ()),
+    ("gestating", np.bool_, ()),
+    ("gestation_timer", np.int64, ()),
+    ("generation", np.int64, ()),
+    ("color", np.uint8, (3,)),
+    ("alive", np.bool_, ()),
+    ("death_cause", np.int8, ()),
+    ("inputs", np.float64, (NN_INPUT_SIZE,)),
+)
+
+# ----------------------
+# Population
+# ----------------------
+# Structure-of-arrays store for every organism of one species. Row i of each
+# array describes the organism in slot i; slots past self.size are unused.
+# Neural network weights are stored the same way, see neural_batch.py.
+class Population:
+    def __init__(self, species, capacity=256):
+        self.species = species
+        self.size = 0
+        self.next_id = 1
+        self.deaths = {cause: 0 for cause in DEATH_CAUSES}
+
+        hidden = species.nn_hidden_size
+        self.columns = COLUMNS + (
+            ("w1", np.float64, (hidden, NN_INPUT_SIZE)),
+            ("b1", np.float64, (hidden,)),
+            ("w2", np.float64, (NN_OUTPUT_SIZE, hidden)),
+            ("b2", np.float64, (NN_OUTPUT_SIZE,)),
+            ("hidden", np.float64, (hidden,)), # Activations of the last forward pass, see think()
+            ("outputs", np.float64, (NN_OUTPUT_SIZE,)),
+        )
+        for name, dtype, shape in self.columns:
+            setattr(self, name, np.zeros((capacity,) + shape, dtype=dtype))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive[:self.size]))
+
+    @property
+    def capacity(self):
+        return len(self.x)
+
+    def living(self):
+        return np.flatnonzero(self.alive[:self.size])
+
+    # ------------------ Storage ------------------
+    def reserve(self, count):
+        needed = self.size + count
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2)
+        for name, dtype, shape in self.columns:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + shape, dtype=dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def add(self, x, y, rotation, energy, lifespan, color, generation, weights):
+        count = len(x)
+        self.reserve(count)
+        s = slice(self.size, self.size + count)
+
+        self.id[s] = np.arange(self.next_id, self.next_id + count)
+        self.next_id += count
+        self.x[s], self.y[s] = x, y
+        self.rotation[s] = rotation
+        self.speed[s] = 0
+        self.energy[s] = energy
+        self.age[s] = 0
+        self.lifespan[s] = lifespan
+        self.gestating[s] = False
+        self.gestation_timer[s] = 0
+        self.generation[s] = generation
+        self.color[s] = color
+        self.alive[s] = True
+        self.death_cause[s] = 0
+        self.inputs[s] = 0
+        self.hidden[s] = 0
+        self.outputs[s] = 0
+        self.w1[s], self.b1[s], self.w2[s], self.b2[s] = weights
+
+        self.size += count
+        return np.arange(s.start, s.stop)
+
+    def compact(self):
+        # Drop dead slots once they make up a quarter of the store
+        keep = self.alive[:self.size].copy()
+        if self.size - np.count_nonzero(keep) <= self.size // 4:
+            return
+        count = int(np.count_nonzero(keep))
+        for name, dtype, shape in self.columns:
+            arr = getattr(self, name)
+            arr[:count] = arr[:self.size][keep]
+        self.size = count
+
+    # ------------------ Spawning ------------------
+    def spawn_random(self, count, streams, field_w, field_h):
+        # Positions come from the spawn stream, traits from the organisms one and weights from the brains one
+        sp = self.species
+        rng = streams.organisms
+        x = streams.spawn.integers(50, field_w - 50 + 1, size=count).astype(np.float64)
+        y = streams.spawn.integers(50, field_h - 50 + 1, size=count).astype(np.float64)
+        color = np.stack([rng.integers(lo, hi + 1, size=count) for lo, hi in sp.color_range], axis=1)
+        return self.add(
+            x=x,
+            y=y,
+            rotation=rng.uniform(0, 2 * math.pi, size=count),
+            energy=rng.uniform(*sp.energy_start, size=count),
+            lifespan=rng.integers(sp.lifespan_range[0], sp.lifespan_range[1] + 1, size=count),
+            color=color,
+            generation=np.ones(count, dtype=np.int64),
+            weights=neural_batch.random_weights(streams.brains, count, NN_INPUT_SIZE, sp.nn_hidden_size, NN_OUTPUT_SIZE),
+        )
+
+    def give_birth(self, parents, streams, field_w, field_h):
+        # Returns the children's slots, in the same order as parents
+        sp = self.species
+        count = len(parents)
+        if count == 0:
+            return parents
+
+        rng = streams.organisms
+        mutate = rng.integers(-sp.color_mutate_rand, sp.color_mutate_rand + 1, size=(count, 3))
+        color = np.clip(self.color[parents].astype(np.int64) + mutate, 0, 255)
+        return self.add(
+            x=(self.x[parents] + rng.integers(-20, 21, size=count)) % field_w,
+            y=(self.y[parents] + rng.integers(-20, 21, size=count)) % field_h,
+            rotation=rng.uniform(0, 2 * math.pi, size=count),
+            energy=np.full(count, sp.born_energy, dtype=np.float64),
+            lifespan=rng.integers(sp.lifespan_range[0], sp.lifespan_range[1] + 1, size=count),
+            color=color,
+            generation=self.generation[parents] + 1,
+            weights=neural_batch.mutate(streams.brains, self.w1[parents], self.b1[parents], self.w2[parents], self.b2[parents]),
+        )
+
+    # ------------------ Tick ------------------
+    def kill(self, idx, cause):
+        self.alive[idx] = False
+        self.death_cause[idx] = cause
+        self.deaths[cause] += len(idx)
+
+    def age_and_metabolize(self):
+        n = self.size
+        alive = self.alive[:n]
+
+        # Die of old age
+        self.age[:n][alive] += 1
+        self.kill(np.flatnonzero(alive & (self.age[:n] >= self.lifespan[:n])), OLD_AGE)
+
+        # Die when energy runs out
+        alive = self.alive[:n]
+        self.energy[:n][alive] -= self.species.metabolism
+        self.kill(np.flatnonzero(alive & (self.energy[:n] <= 0)), STARVATION)
+
+    def gestate(self):
+        # Returns the slots whose gestation finished this tick
+        n = self.size
+        pregnant = self.alive[:n] & self.gestating[:n]
+        self.gestation_timer[:n][pregnant] -= 1
+        due = np.flatnonzero(pregnant & (self.gestation_timer[:n] <= 0))
+        self.gestating[due] = False
+        self.gestation_timer[due] = 0
+        return due
+
+    def think(self, idx, inputs):
+        # One batched forward pass for every slot in idx, returns rotate_out, move_out.
+        # The inputs and activations are kept so viewers can show them without redoing the pass
+        self.inputs[idx] = inputs
+        self.hidden[idx], self.outputs[idx] = neural_batch.forward(self.w1[idx], self.b1[idx], self.w2[idx], self.b2[idx], inputs)
+        return self.outputs[idx, 0], self.outputs[idx, 1]
+
+    def move(self, idx, rotate_out, move_out, field_w, field_h):
+        sp = self.species
+
+        # Rotation
+        turning = np.abs(rotate_out) > sp.rotate_threshold
+        turn = np.where(turning, rotate_out / sp.rotate_mul, 0.0)
+        self.rotation[idx] += turn
+        self.energy[idx] -= np.abs(turn) / sp.metabolism_rot_add_inv
+
+        # Movement
+        moving = np.abs(move_out) > sp.speed_threshold
+        mul = np.where(move_out > 0, sp.speed_mul, sp.speed_mul_rev)
+        speed = np.where(moving, move_out * mul, 0.0)
+        self.speed[idx] = speed
+        self.energy[idx] -= np.abs(speed) / sp.metabolism_speed_add_inv
+
+        rotation = self.rotation[idx]
+        self.x[idx] = (self.x[idx] + np.cos(rotation) * speed) % field_w
+        self.y[idx] = (self.y[idx] + np.sin(rotation) * speed) % field_h
+
+    def start_gestation(self, idx):
+        # Pay for and start a pregnancy for every slot in idx that can reproduce
+        sp = self.species
+        ready = idx[(self.energy[idx] > sp.reproduction_threshold) & ~self.gestating[idx]]
+        self.energy[ready] -= sp.reproduction_threshold - sp.reproduction_return
+        self.gestating[ready] = True
+        self.gestation_timer[ready] = sp.gestation_period
+        return ready
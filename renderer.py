@@ -0,0 +1,278 @@
+import functools
+import math
+import tkinter as tk
+import numpy as np
+from variables import *
+
+# ----------------------
+# CanvasRenderer
+# ----------------------
+# Draws a World onto a tk.Canvas with one canvas item per plant and three per
+# organism (body, facing line and vision cone). Runs once per displayed frame,
+# only keeps items for things inside the view, only moves items whose screen
+# position changed, and deletes everything that left the view or died in one call.
+# Organisms are tracked by species and id rather than by object, so the copies
+# in every new worker Snapshot keep using the same items. Newly visible
+# organisms get their items over several frames when there are many at once.
+class CanvasRenderer:
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.plant_items = {}
+        self.organism_items = {}
+        self.organism_coords = {}
+        self.camera = None
+        self.selected = None
+        self.calls = 0 # Canvas calls issued so far, for the profiler panel
+
+    def render(self, world, camera_x, camera_y, scale, view_w, view_h, selected=None):
+        camera = (camera_x, camera_y, scale)
+        camera_moved = camera != self.camera
+        self.camera = camera
+        stale = []
+
+        # Visible part of the field, in world units
+        x0, y0 = camera_x, camera_y
+        x1, y1 = camera_x + view_w / scale, camera_y + view_h / scale
+
+        # Plants
+        visible = world.plant_index.in_rect(x0 - PLANT_SIZE, y0 - PLANT_SIZE, x1 + PLANT_SIZE, y1 + PLANT_SIZE)
+        visible_set = set(visible)
+        for plant in [p for p in self.plant_items if p not in visible_set]:
+            stale.append(self.plant_items.pop(plant))
+
+        for plant in visible:
+            item = self.plant_items.get(plant)
+            if item is not None and not camera_moved:
+                continue # Plants don't move, so they only change on screen with the camera
+
+            x = (plant.x - camera_x) * scale
+            y = (plant.y - camera_y) * scale
+            r = plant.size / 2 * scale
+            if item is None:
+                item = self.canvas.create_rectangle(x - r, y - r, x + r, y + r, fill="#{:02x}{:02x}{:02x}".format(*plant.color), outline="")
+                self.canvas.tag_lower(item)
+                self.plant_items[plant] = item
+                self.calls += 2
+            else:
+                self.canvas.coords(item, x - r, y - r, x + r, y + r)
+                self.calls += 1
+
+        # Organisms, including those just outside the view whose vision cone reaches into it
+        reach = max(HERB_VISION_CONE_LENGTH, CARN_VISION_CONE_LENGTH)
+        visible = (world.herb_index.in_rect(x0 - reach, y0 - reach, x1 + reach, y1 + reach) +
+                   world.carn_index.in_rect(x0 - reach, y0 - reach, x1 + reach, y1 + reach))
+        visible_keys = {organism_key(o) for o in visible}
+        for key in [k for k in self.organism_items if k not in visible_keys]:
+            stale.extend(self.organism_items.pop(key))
+            del self.organism_coords[key]
+
+        # Items for at most SYS_NEW_ITEMS_PER_FRAME organisms new to the view, so a burst of births
+        # or a jump of the camera is spread over a few frames instead of stalling one
+        budget = SYS_NEW_ITEMS_PER_FRAME
+        for organism in visible:
+            if organism_key(organism) not in self.organism_items:
+                if budget == 0:
+                    continue
+                budget -= 1
+            self.draw_organism(organism, camera_x, camera_y, scale)
+
+        # Darker vision cone when spectated
+        selected = organism_key(selected)
+        if selected != self.selected:
+            for key, stipple in ((self.selected, "gray25"), (selected, "gray75")):
+                items = self.organism_items.get(key)
+                if items is not None:
+                    self.canvas.itemconfig(items[2], stipple=stipple)
+                    self.calls += 1
+            self.selected = selected
+
+        if stale:
+            self.canvas.delete(*stale)
+            self.calls += 1
+
+    def draw_organism(self, organism, camera_x, camera_y, scale):
+        x = (organism.x - camera_x) * scale
+        y = (organism.y - camera_y) * scale
+        sp = organism.species
+        r = sp.radius * scale
+
+        # Calculate vision cone
+        cone_length = sp.vision_length * scale
+        left_angle = organism.rotation - sp.vision_width
+        right_angle = organism.rotation + sp.vision_width
+
+        # Whole pixels are enough to tell whether anything visibly changed
+        body = (round(x - r), round(y - r), round(x + r), round(y + r))
+        line = (round(x), round(y),
+                round(x + math.cos(organism.rotation) * r),
+                round(y + math.sin(organism.rotation) * r))
+        cone = (round(x), round(y),
+                round(x + math.cos(left_angle) * cone_length), round(y + math.sin(left_angle) * cone_length),
+                round(x + math.cos(right_angle) * cone_length), round(y + math.sin(right_angle) * cone_length))
+
+        key = organism_key(organism)
+        items = self.organism_items.get(key)
+        if items is None:
+            # Vision cone + body
+            stipple = "gray75" if key == self.selected else "gray25"
+            items = (
+                self.canvas.create_oval(*body, fill="#{:02x}{:02x}{:02x}".format(*organism.color), outline=""),
+                self.canvas.create_line(*line, fill="black"),
+                self.canvas.create_polygon(*cone, fill=sp.vision_color, stipple=stipple, outline=""),
+            )
+            self.organism_items[key] = items
+            self.organism_coords[key] = (body, line, cone)
+            self.calls += 3
+            return
+
+        old_body, old_line, old_cone = self.organism_coords[key]
+        if body != old_body:
+            self.canvas.coords(items[0], *body)
+            self.calls += 1
+        if line != old_line:
+            self.canvas.coords(items[1], *line)
+            self.calls += 1
+        if cone != old_cone:
+            self.canvas.coords(items[2], *cone)
+            self.calls += 1
+        self.organism_coords[key] = (body, line, cone)
+
+def organism_key(organism):
+    # Herbivores and carnivores count their ids separately
+    return None if organism is None else (type(organism), organism.id)
+
+
+# ----------------------
+# RasterRenderer
+# ----------------------
+# Alternative to CanvasRenderer for big worlds: the visible part of the field
+# is painted into one NumPy image per frame and shown as a single canvas image,
+# so Tk only ever holds one item no matter how many organisms there are.
+class RasterRenderer:
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.image = None
+        self.item = None
+        self.calls = 0
+
+    def render(self, world, camera_x, camera_y, scale, view_w, view_h, selected=None):
+        frame = self.paint(world, camera_x, camera_y, scale, view_w, view_h, selected)
+
+        # Show the frame
+        header = f"P6 {view_w} {view_h} 255 ".encode()
+        self.image = tk.PhotoImage(master=self.canvas, width=view_w, height=view_h, data=header + frame.tobytes(), format="PPM")
+        if self.item is None:
+            self.item = self.canvas.create_image(0, 0, anchor="nw", image=self.image)
+        else:
+            self.canvas.itemconfig(self.item, image=self.image)
+        self.calls += 2 # Creating the image and showing it
+
+    def paint(self, world, camera_x, camera_y, scale, view_w, view_h, selected=None):
+        # The frame as a (view_h, view_w, 3) array, without touching Tk
+        frame = np.full((view_h, view_w, 3), 255, dtype=np.uint8)
+        x0, y0 = camera_x, camera_y
+        x1, y1 = camera_x + view_w / scale, camera_y + view_h / scale
+
+        # Plants
+        plants = world.plant_index.in_rect(x0 - PLANT_SIZE, y0 - PLANT_SIZE, x1 + PLANT_SIZE, y1 + PLANT_SIZE)
+        if plants:
+            sx = np.array([(p.x - camera_x) * scale for p in plants]).round().astype(np.int64)
+            sy = np.array([(p.y - camera_y) * scale for p in plants]).round().astype(np.int64)
+            colors = np.array([p.color for p in plants], dtype=np.uint8)
+            half = int(PLANT_SIZE / 2 * scale)
+            stamp(frame, sx, sy, square_offsets(half), colors)
+
+        # Organisms, including those just outside the view whose vision cone reaches into it
+        for index in (world.herb_index, world.carn_index):
+            reach = max(HERB_VISION_CONE_LENGTH, CARN_VISION_CONE_LENGTH)
+            organisms = index.in_rect(x0 - reach, y0 - reach, x1 + reach, y1 + reach)
+            if not organisms:
+                continue
+
+            sx = np.array([(o.x - camera_x) * scale for o in organisms])
+            sy = np.array([(o.y - camera_y) * scale for o in organisms])
+            rotation = np.array([o.rotation for o in organisms])
+            colors = np.array([o.color for o in organisms], dtype=np.uint8)
+            sp = organisms[0].species
+            r = max(1, int(sp.radius * scale))
+
+            # Vision cones, blended like the canvas stipple (darker when spectated)
+            alpha = np.array([0.75 if o is selected else 0.25 for o in organisms])
+            cone_color = np.array(VISION_COLORS[sp.vision_color], dtype=np.float32)
+            blend_cones(frame, sx, sy, rotation, sp.vision_length * scale, sp.vision_width, alpha, cone_color)
+
+            # Bodies & facing lines
+            ix, iy = sx.round().astype(np.int64), sy.round().astype(np.int64)
+            stamp(frame, ix, iy, disk_offsets(r), colors)
+            t = np.arange(r + 1)
+            lx = (sx[:, None] + np.cos(rotation)[:, None] * t).round().astype(np.int64).ravel()
+            ly = (sy[:, None] + np.sin(rotation)[:, None] * t).round().astype(np.int64).ravel()
+            stamp(frame, lx, ly, np.zeros((1, 2), dtype=np.int64), np.zeros((len(lx), 3), dtype=np.uint8))
+        return frame
+
+# Canvas color names used for vision cones
+VISION_COLORS = {"blue": (0, 0, 255), "red": (255, 0, 0)}
+
+def square_offsets(half):
+    d = np.arange(-half, half + 1)
+    gx, gy = np.meshgrid(d, d)
+    return np.stack([gx.ravel(), gy.ravel()], axis=1)
+
+def disk_offsets(r):
+    offsets = square_offsets(r)
+    return offsets[(offsets ** 2).sum(axis=1) <= r * r]
+
+def stamp(frame, sx, sy, offsets, colors):
+    # Paint every pixel offset around every (sx, sy) in that point's color
+    h, w = frame.shape[:2]
+    px = (sx[:, None] + offsets[None, :, 0]).ravel()
+    py = (sy[:, None] + offsets[None, :, 1]).ravel()
+    c = np.repeat(colors, len(offsets), axis=0)
+    ok = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+    frame[py[ok], px[ok]] = c[ok]
+
+def blend_cones(frame, sx, sy, rotation, length, width, alpha, color):
+    # Every cone is stamped from the triangle of its rotation bucket (see cone_offsets), all at once.
+    # Cones are counted on a frame grown by two cone lengths on every side and only the ones whose apex
+    # is within a cone length of the frame are kept, so the stamps need no clipping: a pixel's index
+    # is the apex's index plus the triangle's. alpha is per cone
+    h, w = frame.shape[:2]
+    reach = int(math.ceil(length)) + 1
+    pad = 2 * reach
+    pw, ph = w + 2 * pad, h + 2 * pad
+    ix, iy = sx.round().astype(np.int64) + pad, sy.round().astype(np.int64) + pad
+    near = (ix >= reach) & (ix < pw - reach) & (iy >= reach) & (iy < ph - reach)
+    apex = (iy * pw + ix)[near]
+    fade = np.log1p(-alpha)[near] # Overlapping cones darken like stacked stipples, multiplying what shows through
+    bucket = (np.round(rotation / (2 * math.pi) * CONE_BUCKETS).astype(np.int64) % CONE_BUCKETS)[near]
+    pixels, weights = [], []
+    for b in np.unique(bucket).tolist():
+        offsets = cone_offsets(length, width, b)
+        members = bucket == b
+        pixels.append((apex[members][:, None] + (offsets[:, 1] * pw + offsets[:, 0])[None, :]).ravel())
+        weights.append(np.repeat(fade[members], len(offsets)))
+    if not pixels:
+        return
+    faded = np.bincount(np.concatenate(pixels), np.concatenate(weights), minlength=pw * ph)
+    keep = np.exp(faded.reshape(ph, pw)[pad:pad + h, pad:pad + w], dtype=np.float32)
+
+    # One channel at a time, which keeps the float temporaries a third of the frame
+    for c in range(3):
+        frame[:, :, c] = frame[:, :, c] * keep + (float(color[c]) * (1 - keep) + 0.5)
+
+# Rotations cones are rounded to, so a frame only needs a few triangles however many organisms it shows
+CONE_BUCKETS = 64
+
+@functools.lru_cache(maxsize=4 * CONE_BUCKETS)
+def cone_offsets(length, width, bucket):
+    # Pixel offsets from the apex of the canvas polygon's triangle, turned to the bucket's rotation
+    rot = bucket * 2 * math.pi / CONE_BUCKETS
+    fx, fy = math.cos(rot), math.sin(rot)
+    xs = [0, math.cos(rot - width) * length, math.cos(rot + width) * length]
+    ys = [0, math.sin(rot - width) * length, math.sin(rot + width) * length]
+    dx, dy = np.meshgrid(np.arange(math.floor(min(xs)), math.ceil(max(xs)) + 1),
+                         np.arange(math.floor(min(ys)), math.ceil(max(ys)) + 1))
+    along = dx * fx + dy * fy
+    across = np.abs(dy * fx - dx * fy)
+    inside = (along >= 0) & (along <= length * math.cos(width)) & (across <= along * math.tan(width))
+    return np.stack([dx[inside], dy[inside]], axis=1)
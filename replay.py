@@ -0,0 +1,226 @@
+import json
+import time
+import numpy as np
+import variables
+import neural_network
+from population import DEATH_CAUSES
+
+# ----------------------
+# Replay log
+# ----------------------
+# Compact binary record of a seeded run: a JSON header with everything needed
+# to start the same run again (engine, seed, field size, network activation and
+# the constants in variables.py), followed by fixed size event records. Re-running the header
+# must produce exactly the same events, which is what `verify` checks, so an
+# optimized engine can be compared against the recording of a reference run.
+
+MAGIC = b"EVOREPLAY2\n"
+
+# Event kinds
+BIRTH = 1   # id was born to other, with color
+DEATH = 2   # id died of cause, at age with energy left
+EAT = 3     # id (of species) ate other, a plant for herbivores and a herbivore for carnivores
+
+SPECIES = {"herbivore": 1, "carnivore": 2}
+CAUSES = {name: code for code, name in DEATH_CAUSES.items()}
+
+EVENT = np.dtype([
+    ("tick", "<i4"),
+    ("kind", "u1"),
+    ("species", "u1"),
+    ("cause", "u1"),
+    ("id", "<i8"),
+    ("other", "<i8"),
+    ("age", "<i4"),
+    ("energy", "<f8"),
+    ("color", "u1", (3,)),
+])
+
+def settings():
+    # Every constant in variables.py, they decide the outcome of a run as much as the seed
+    return {name: getattr(variables, name) for name in dir(variables) if name.isupper()}
+
+def make_header(world, engine):
+    return {
+        "engine": engine,
+        "seed": world.seed,
+        "field": [world.field_w, world.field_h],
+        "activation": neural_network.ACTIVATION,
+        "variables": settings(),
+    }
+
+# ----------------------
+# ReplayLog
+# ----------------------
+# Collects events in a fixed size buffer and writes it out whenever it fills
+# up. Without a path the events are kept in memory instead. Worlds call the
+# single-event methods (object engine) or the array ones (vector engine) and
+# set `tick` at the start of every step. Every block of events written out is
+# also handed to `lineage` (a lineage.Lineage) when one is given.
+class ReplayLog:
+    def __init__(self, path=None, header=None, buffer_size=1 << 16, lineage=None):
+        self.tick = 0
+        self.lineage = lineage
+        self.buffer = np.zeros(buffer_size, dtype=EVENT)
+        self.count = 0
+        self.chunks = []
+        self.file = None
+        if path is not None:
+            data = json.dumps(header).encode()
+            self.file = open(path, "wb")
+            self.file.write(MAGIC + len(data).to_bytes(4, "little") + data)
+
+    # ------------------ Single events ------------------
+    def add(self, kind, species, cause, id, other, age=0, energy=0.0, color=(0, 0, 0)):
+        if self.count == len(self.buffer):
+            self.flush()
+        self.buffer[self.count] = (self.tick, kind, SPECIES[species], cause, id, other, age, energy, color)
+        self.count += 1
+
+    def birth(self, species, child_id, parent_id, color):
+        self.add(BIRTH, species, 0, child_id, parent_id, color=color)
+
+    def death(self, species, id, cause, age, energy):
+        self.add(DEATH, species, CAUSES[cause], id, 0, age, energy)
+
+    def eat(self, species, eater_id, food_id):
+        self.add(EAT, species, 0, eater_id, food_id)
+
+    # ------------------ Event arrays ------------------
+    def add_many(self, kind, species, cause, ids, others, ages=0, energies=0.0, colors=0):
+        count = len(ids)
+        if count == 0:
+            return
+        if self.count + count > len(self.buffer):
+            self.flush()
+        large = count > len(self.buffer)
+        rows = np.zeros(count, dtype=EVENT) if large else self.buffer[self.count:self.count + count]
+        rows["tick"] = self.tick
+        rows["kind"] = kind
+        rows["species"] = SPECIES[species]
+        rows["cause"] = cause
+        rows["id"] = ids
+        rows["other"] = others
+        rows["age"] = ages
+        rows["energy"] = energies
+        rows["color"] = colors
+        if large:
+            self.write(rows)
+        else:
+            self.count += count
+
+    def births(self, species, child_ids, parent_ids, colors):
+        self.add_many(BIRTH, species, 0, child_ids, parent_ids, colors=colors)
+
+    def deaths(self, species, ids, causes, ages, energies):
+        self.add_many(DEATH, species, causes, ids, 0, ages, energies)
+
+    def eats(self, species, eater_ids, food_ids):
+        self.add_many(EAT, species, 0, eater_ids, food_ids)
+
+    # ------------------ Output ------------------
+    def write(self, rows):
+        if self.lineage is not None:
+            self.lineage.add(rows)
+        if self.file is not None:
+            self.file.write(rows.tobytes())
+        else:
+            self.chunks.append(rows.copy())
+
+    def flush(self):
+        if self.count:
+            self.write(self.buffer[:self.count])
+            self.count = 0
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def events(self):
+        # Everything recorded so far, for in-memory logs
+        self.flush()
+        return np.concatenate(self.chunks) if self.chunks else np.zeros(0, dtype=EVENT)
+
+def read_header(f, path):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{path} is not a replay log")
+    size = int.from_bytes(f.read(4), "little")
+    return json.loads(f.read(size))
+
+def read(path):
+    with open(path, "rb") as f:
+        header = read_header(f, path)
+        events = np.frombuffer(f.read(), dtype=EVENT)
+    return header, events
+
+def read_chunks(path, count=1 << 20):
+    # The events of a log in blocks of at most count, for logs too big to load at once
+    with open(path, "rb") as f:
+        read_header(f, path)
+        while True:
+            data = f.read(count * EVENT.itemsize)
+            if not data:
+                return
+            yield np.frombuffer(data, dtype=EVENT)
+
+def make_world(header):
+    # A fresh world that starts exactly like the recorded one
+    w, h = header["field"]
+    neural_network.ACTIVATION = header.get("activation", "exact")
+    if header["engine"] in ("vector", "tiled"):
+        from vector_world import VectorWorld
+        return VectorWorld(w, h, seed=header["seed"])
+    from world import World
+    return World(w, h, seed=header["seed"])
+
+def verify(path, ticks=None):
+    # Runs the recorded run again and compares its events with the log.
+    # Returns (first tick where the events differ or None, ticks run, seconds)
+    header, recorded = read(path)
+    changed = [name for name, value in header["variables"].items() if settings().get(name) != value]
+    if changed:
+        print(f"Warning: constants changed since the recording: {', '.join(changed)}")
+
+    last = int(recorded["tick"][-1]) + 1 if len(recorded) else 0
+    ticks = last if ticks is None else min(ticks, last)
+    world = make_world(header)
+    log = world.events = ReplayLog()
+
+    start = time.perf_counter()
+    while world.tick_count < ticks and not world.is_over():
+        world.step()
+    seconds = time.perf_counter() - start
+
+    replayed = log.events()
+    recorded = recorded[recorded["tick"] < ticks]
+    replayed = replayed[replayed["tick"] < ticks]
+    if len(recorded) == len(replayed) and np.array_equal(recorded, replayed):
+        return None, world.tick_count, seconds
+
+    n = min(len(recorded), len(replayed))
+    differ = np.flatnonzero(recorded[:n] != replayed[:n])
+    first = differ[0] if len(differ) else n
+    tick = min(recorded["tick"][first] if first < len(recorded) else ticks,
+               replayed["tick"][first] if first < len(replayed) else ticks)
+    return int(tick), world.tick_count, seconds
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check that a recorded run (world.py --replay) still plays out the same")
+    parser.add_argument("log", help="Replay log to check against")
+    parser.add_argument("--ticks", type=int, default=None, help="Only check the first TICKS ticks")
+    args = parser.parse_args()
+
+    tick, ran, seconds = verify(args.log, args.ticks)
+    print(f"{ran} ticks in {seconds:.2f}s ({ran / max(seconds, 1e-9):.0f} ticks/s)")
+    if tick is None:
+        print("Identical to the recording")
+    else:
+        print(f"Differs from the recording from tick {tick}")
+        raise SystemExit(1)
@@ -0,0 +1,130 @@
+from variables import *
+
+# ----------------------
+# SpatialIndex
+# ----------------------
+# Uniform grid over the (wrapping) field. Objects stay in the index between
+# ticks and only change cell when they cross a cell boundary, so unmoving
+# plants are inserted once and removed when eaten. Cells wrap around the edges
+# the same way movement does, so an organism at x=5 sees one at field_w-5.
+# Cells are stretched so a whole number of them fits the field (see `grid`):
+# a narrower last cell would put things just across the seam two cells apart.
+class SpatialIndex:
+    def __init__(self, field_w, field_h, cell_size=SYS_CELL_SIZE):
+        self.field_w, self.field_h = field_w, field_h
+        self.half_w, self.half_h = field_w / 2, field_h / 2
+        self.cell_size = cell_size
+        self.cols, self.rows, self.cell_w, self.cell_h = grid(field_w, field_h, cell_size)
+
+        # Cell -> members (a dict used as an insertion ordered set) and member -> cell
+        self.cells = {}
+        self.cell_of = {}
+        self._neighbors = {}
+
+        # Running totals of nearby() calls and of the candidates they returned, for the profiler panel
+        self.queries = 0
+        self.examined = 0
+
+    def __len__(self):
+        return len(self.cell_of)
+
+    def __contains__(self, obj):
+        return obj in self.cell_of
+
+    def cell(self, x, y):
+        return int(x // self.cell_w) % self.cols + int(y // self.cell_h) % self.rows * self.cols
+
+    # ------------------ Membership ------------------
+    def insert(self, obj):
+        cell = self.cell(obj.x, obj.y)
+        self.cell_of[obj] = cell
+        members = self.cells.get(cell)
+        if members is None:
+            members = self.cells[cell] = {}
+        members[obj] = None
+
+    def remove(self, obj):
+        cell = self.cell_of.pop(obj, None)
+        if cell is not None:
+            del self.cells[cell][obj]
+
+    def move(self, obj):
+        # Call after obj.x/obj.y changed, inserts obj if it isn't indexed yet
+        cell = self.cell(obj.x, obj.y)
+        old = self.cell_of.get(obj)
+        if cell == old:
+            return
+        if old is not None:
+            del self.cells[old][obj]
+        self.cell_of[obj] = cell
+        members = self.cells.get(cell)
+        if members is None:
+            members = self.cells[cell] = {}
+        members[obj] = None
+
+    def copy(self):
+        # Same members in the same cells, unaffected by later changes to this index
+        other = SpatialIndex(self.field_w, self.field_h, self.cell_size)
+        other.cells = {cell: dict(members) for cell, members in self.cells.items()}
+        other.cell_of = dict(self.cell_of)
+        other._neighbors = self._neighbors
+        return other
+
+    # ------------------ Queries ------------------
+    def neighbor_cells(self, cell):
+        # The 3x3 block of cells around a cell, wrapped and without duplicates on tiny fields
+        neighbors = self._neighbors.get(cell)
+        if neighbors is None:
+            cx, cy = cell % self.cols, cell // self.cols
+            neighbors = []
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    n = (cx + dx) % self.cols + (cy + dy) % self.rows * self.cols
+                    if n not in neighbors:
+                        neighbors.append(n)
+            self._neighbors[cell] = neighbors
+        return neighbors
+
+    def nearby(self, x, y, radius=None):
+        # Everything in the cells within radius of (x, y), one cell in every direction by default
+        if radius is None or radius <= min(self.cell_w, self.cell_h):
+            cells = self.neighbor_cells(self.cell(x, y))
+        else:
+            span_x = range(int((x - radius) // self.cell_w), int((x + radius) // self.cell_w) + 1)
+            span_y = range(int((y - radius) // self.cell_h), int((y + radius) // self.cell_h) + 1)
+            cells = dict.fromkeys(cx % self.cols + cy % self.rows * self.cols for cy in span_y for cx in span_x)
+
+        found = []
+        for cell in cells:
+            members = self.cells.get(cell)
+            if members:
+                found.extend(members)
+        self.queries += 1
+        self.examined += len(found)
+        return found
+
+    def in_rect(self, x0, y0, x1, y1):
+        # Everything in the cells overlapping a rectangle, without wrapping. Used to cull drawing to the view
+        cx0 = max(0, int(x0 // self.cell_w))
+        cy0 = max(0, int(y0 // self.cell_h))
+        cx1 = min(self.cols - 1, int(x1 // self.cell_w))
+        cy1 = min(self.rows - 1, int(y1 // self.cell_h))
+
+        found = []
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                members = self.cells.get(cx + cy * self.cols)
+                if members:
+                    found.extend(members)
+        return found
+
+    def offset(self, x0, y0, x1, y1):
+        # Shortest (dx, dy) from (x0, y0) to (x1, y1) on the wrapping field
+        return (x1 - x0 + self.half_w) % self.field_w - self.half_w, (y1 - y0 + self.half_h) % self.field_h - self.half_h
+
+def grid(field_w, field_h, cell_size=SYS_CELL_SIZE):
+    # (cols, rows, cell_w, cell_h): as many cells as fit whole, stretched to cover the field exactly,
+    # so no cell is smaller than cell_size and neighboring cells really are neighbors across the seam
+    cols = max(1, int(field_w // cell_size))
+    rows = max(1, int(field_h // cell_size))
+    return cols, rows, field_w / cols, field_h / rows
@@ -0,0 +1,91 @@
+from variables import *
+
+# ----------------------
+# Species
+# ----------------------
+# Constants shared by every organism of one species, so they only have to be
+# stored once instead of on every individual
+class Species:
+    def __init__(self, name, radius, color_range, color_mutate_rand, energy_start, born_energy,
+                 lifespan_range, nn_hidden_size, reproduction_threshold, reproduction_return,
+                 gestation_period, rotate_threshold, rotate_mul, metabolism, metabolism_rot_add_inv,
+                 speed_threshold, speed_mul, speed_mul_rev, metabolism_speed_add_inv,
+                 vision_length, vision_width, vision_color):
+        self.name = name
+        self.radius = radius
+        self.color_range = color_range
+        self.color_mutate_rand = color_mutate_rand
+        self.energy_start = energy_start
+        self.born_energy = born_energy
+        self.lifespan_range = lifespan_range
+        self.nn_hidden_size = nn_hidden_size
+        self.reproduction_threshold = reproduction_threshold
+        self.reproduction_return = reproduction_return
+        self.gestation_period = gestation_period
+        self.rotate_threshold = rotate_threshold
+        self.rotate_mul = rotate_mul
+        self.metabolism = metabolism
+        self.metabolism_rot_add_inv = metabolism_rot_add_inv
+        self.speed_threshold = speed_threshold
+        self.speed_mul = speed_mul
+        self.speed_mul_rev = speed_mul_rev
+        self.metabolism_speed_add_inv = metabolism_speed_add_inv
+        self.vision_length = vision_length
+        self.vision_width = vision_width
+        self.vision_cos = math.cos(vision_width) # Cone test without an atan2, see Herbivore.get_inputs
+        self.vision_color = vision_color
+
+
+HERBIVORE = Species(
+    "herbivore",
+    radius=HERB_RADIUS_START,
+    color_range=((HERB_START_COLOR_R_0, HERB_START_COLOR_R_1),
+                 (HERB_START_COLOR_G_0, HERB_START_COLOR_G_1),
+                 (HERB_START_COLOR_B_0, HERB_START_COLOR_B_1)),
+    color_mutate_rand=HERB_COLOR_MUTATE_RAND,
+    energy_start=(HERB_ENERGY_START_MIN, HERB_ENERGY_START_MAX),
+    born_energy=HERB_BORN_ENERGY,
+    lifespan_range=(HERB_LIFESPAN_MIN, HERB_LIFESPAN_MAX),
+    nn_hidden_size=HERB_NN_HIDDEN_SIZE,
+    reproduction_threshold=HERB_REPRODUCTION_THRESHOLD,
+    reproduction_return=HERB_REPRODUCTION_RETURN,
+    gestation_period=HERB_GESTATION_PERIOD,
+    rotate_threshold=HERB_ROTATE_THRESHOLD,
+    rotate_mul=HERB_ROTATE_MUL,
+    metabolism=HERB_METABOLISM,
+    metabolism_rot_add_inv=HERB_METABOLISM_ROTATE_ADD_INV,
+    speed_threshold=HERB_SPEED_THRESHOLD,
+    speed_mul=HERB_SPEED_MUL,
+    speed_mul_rev=HERB_SPEED_MUL_REV,
+    metabolism_speed_add_inv=HERB_METABOLISM_SPEED_ADD_INV,
+    vision_length=HERB_VISION_CONE_LENGTH,
+    vision_width=HERB_VISION_CONE_WIDTH,
+    vision_color="blue",
+)
+
+CARNIVORE = Species(
+    "carnivore",
+    radius=CARN_RADIUS_START,
+    color_range=((CARN_START_COLOR_R_0, CARN_START_COLOR_R_1),
+                 (CARN_START_COLOR_G_0, CARN_START_COLOR_G_1),
+                 (CARN_START_COLOR_B_0, CARN_START_COLOR_B_1)),
+    color_mutate_rand=CARN_COLOR_MUTATE_RAND,
+    energy_start=(CARN_ENERGY_START_MIN, CARN_ENERGY_START_MAX),
+    born_energy=CARN_BORN_ENERGY,
+    lifespan_range=(CARN_LIFESPAN_MIN, CARN_LIFESPAN_MAX),
+    nn_hidden_size=CARN_NN_HIDDEN_SIZE,
+    reproduction_threshold=CARN_REPRODUCTION_THRESHOLD,
+    reproduction_return=CARN_REPRODUCTION_RETURN,
+    gestation_period=CARN_GESTATION_PERIOD,
+    rotate_threshold=CARN_ROTATE_THRESHOLD,
+    rotate_mul=CARN_ROTATE_MUL,
+    metabolism=CARN_METABOLISM,
+    metabolism_rot_add_inv=CARN_METABOLISM_ROTATE_ADD_INV,
+    speed_threshold=CARN_SPEED_THRESHOLD,
+    speed_mul=CARN_SPEED_MUL,
+    speed_mul_rev=CARN_SPEED_MUL_REV,
+    metabolism_speed_add_inv=CARN_METABOLISM_SPEED_ADD_INV,
+    vision_length=CARN_VISION_CONE_LENGTH,
+    vision_width=CARN_VISION_CONE_WIDTH,
+    vision_color="red",
+)
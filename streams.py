@@ -0,0 +1,43 @@
+import random
+import numpy as np
+
+# Every subsystem that draws random numbers gets its own stream, so a change in
+# how one of them uses randomness doesn't shift the numbers all the others get
+#
+# The object engine draws everything about its children from Streams.births
+# instead, which is spawned from the organisms sequence
+STREAM_NAMES = (
+    "spawn",      # Starting positions of the first plants and organisms
+    "organisms",  # Colors, rotations, lifespans and energy, and where children are born (array engines)
+    "brains",     # Neural network weights, and their mutations (array engines)
+    "plants",     # Plant colors, duplication timers and spreading
+)
+
+def seed_sequences(seed):
+    # The seed actually used (a fresh random one when seed is None) and one child sequence per stream
+    sequence = np.random.SeedSequence(seed)
+    return sequence.entropy, dict(zip(STREAM_NAMES, sequence.spawn(len(STREAM_NAMES))))
+
+# ----------------------
+# Streams
+# ----------------------
+# random.Random per subsystem for the object engine (world.World), plus a
+# NumPy Generator for births, which it handles in batches
+class Streams:
+    def __init__(self, seed=None):
+        self.seed, sequences = seed_sequences(seed)
+        for name, sequence in sequences.items():
+            setattr(self, name, random.Random(int.from_bytes(sequence.generate_state(4).tobytes(), "little")))
+
+        # Children are born a tick's worth at a time, their traits drawn as arrays (see World.give_birth)
+        self.births = np.random.default_rng(sequences["organisms"].spawn(1)[0])
+
+# ----------------------
+# ArrayStreams
+# ----------------------
+# NumPy Generator per subsystem for the array engines (vector_world.VectorWorld)
+class ArrayStreams:
+    def __init__(self, seed=None):
+        self.seed, sequences = seed_sequences(seed)
+        for name, sequence in sequences.items():
+            setattr(self, name, np.random.default_rng(sequence))
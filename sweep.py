@@ -0,0 +1,116 @@
+import ast
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import variables
+
+# ----------------------
+# Parameter sweeps
+# ----------------------
+# Runs many headless simulations with different values for the constants in
+# variables.py, spread over all cores, and writes every run's per-tick data
+# into one CSV. Every run gets a freshly spawned process that changes
+# `variables` before anything else is imported, so every module's
+# `from variables import *` and the species definitions see the new values.
+
+def expand_grid(grid):
+    # {"NAME": [values...], ...} -> one overrides dict per combination
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def check_overrides(overrides):
+    for name in overrides:
+        if not hasattr(variables, name):
+            raise ValueError(f"{name} is not a constant in variables.py")
+
+def run_one(job):
+    # Runs inside a worker process
+    run, overrides, seed, ticks, engine = job
+    for name, value in overrides.items():
+        setattr(variables, name, value)
+
+    from metrics import Metrics
+    if engine == "vector":
+        from vector_world import VectorWorld
+        world = VectorWorld(seed=seed)
+    else:
+        from world import World
+        world = World(seed=seed)
+    world.metrics = Metrics(memory=max(1, ticks)) # Keep the whole run, not just what the graphs show
+
+    start = time.perf_counter()
+    while world.tick_count < ticks and not world.is_over():
+        world.step()
+
+    from metrics import COLUMNS
+    return {
+        "run": run,
+        "seed": seed,
+        "overrides": overrides,
+        "seconds": time.perf_counter() - start,
+        "series": {name: world.metrics.series(name).copy() for name in COLUMNS},
+    }
+
+def run_sweep(override_sets, seeds, ticks, out, engine="object", processes=None):
+    # Every overrides dict is run once per seed. Rows are written as runs finish
+    for overrides in override_sets:
+        check_overrides(overrides)
+    jobs = [(run, overrides, seed, ticks, engine)
+            for run, (overrides, seed) in enumerate(itertools.product(override_sets, seeds))]
+    names = sorted({name for overrides in override_sets for name in overrides})
+
+    from metrics import COLUMNS
+    ctx = multiprocessing.get_context("spawn")
+    with open(out, "w", newline="") as f, ctx.Pool(processes or os.cpu_count(), maxtasksperchild=1) as pool:
+        writer = csv.writer(f)
+        writer.writerow(["run", "seed"] + names + list(COLUMNS))
+        for result in pool.imap_unordered(run_one, jobs):
+            params = [result["overrides"].get(name, getattr(variables, name)) for name in names]
+            series = result["series"]
+            for i in range(len(series["tick"])):
+                writer.writerow([result["run"], result["seed"]] + params + [format_value(name, series[name][i]) for name in COLUMNS])
+            f.flush()
+            print(f"Run {result['run'] + 1}/{len(jobs)} (seed {result['seed']}, {result['overrides']}): "
+                  f"{len(series['tick'])} ticks in {result['seconds']:.1f}s")
+
+def format_value(name, value):
+    # Everything but the percentages is a count
+    return round(float(value), 4) if name.startswith("pct_") else int(value)
+
+def parse_set(text):
+    # NAME=v1,v2,... with Python literal values
+    name, _, values = text.partition("=")
+    if not values:
+        raise ValueError(f"Expected NAME=VALUE[,VALUE...], got {text!r}")
+    parsed = ast.literal_eval(values + ",")
+    return name.strip(), list(parsed)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run headless simulations over a grid or list of parameter overrides")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=V1,V2", help="Values to try for a constant in variables.py, repeat for a grid over several constants")
+    parser.add_argument("--runs", metavar="FILE", help="JSON file with a list of override objects, used instead of a grid")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0], help="Seeds every parameter combination is run with")
+    parser.add_argument("--ticks", type=int, default=10000, help="Maximum amount of ticks per run")
+    parser.add_argument("--engine", choices=["object", "vector"], default="object", help="Object-per-organism engine or the NumPy array engine")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes, all cores by default")
+    parser.add_argument("--out", default="sweep.csv", help="CSV file every run's time series is written to")
+    args = parser.parse_args()
+
+    try:
+        if args.runs:
+            with open(args.runs) as f:
+                override_sets = json.load(f)
+        else:
+            override_sets = expand_grid(dict(parse_set(text) for text in args.set))
+        for overrides in override_sets:
+            check_overrides(overrides)
+    except (ValueError, SyntaxError) as e:
+        parser.error(str(e))
+
+    run_sweep(override_sets, args.seeds, args.ticks, args.out, engine=args.engine, processes=args.processes)
@@ -0,0 +1,23 @@
+import pytest
+import kernels
+
+def test_kernels_match_reference(monkeypatch):
+    # Without numba the kernels are plain Python, still dispatched to when enabled
+    calls = []
+    for name in ("cell_pairs", "first_claims"):
+        kernel = getattr(kernels, name)
+        def counted(*args, kernel=kernel, name=name):
+            calls.append(name)
+            return kernel(*args)
+        monkeypatch.setattr(kernels, name, counted)
+    same, ran = kernels.check(40, 1, (700, 700))
+    assert ran == 40
+    assert same
+    assert "cell_pairs" in calls and "first_claims" in calls
+
+def test_compiled_kernels_match_reference():
+    pytest.importorskip("numba")
+    assert kernels.njit is not None
+    same, ran = kernels.check(100, 2, (900, 700))
+    assert ran == 100
+    assert same
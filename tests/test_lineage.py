@@ -0,0 +1,48 @@
+import numpy as np
+from replay import BIRTH, DEATH, EAT, EVENT, SPECIES
+from lineage import Lineage
+
+HERBIVORE = SPECIES["herbivore"]
+
+def events(*rows):
+    # rows of (tick, kind, id, other, color)
+    out = np.zeros(len(rows), dtype=EVENT)
+    for i, (tick, kind, id, other, color) in enumerate(rows):
+        out[i]["tick"], out[i]["kind"], out[i]["species"] = tick, kind, HERBIVORE
+        out[i]["id"], out[i]["other"], out[i]["color"] = id, other, color
+    return out
+
+def make_lineage():
+    # 3 was spawned, 5 and 6 are its children and 7 is 5's
+    lineage = Lineage()
+    lineage.add(events(
+        (1, BIRTH, 5, 3, (10, 20, 30)),
+        (2, BIRTH, 6, 3, (40, 50, 60)),
+        (3, EAT, 4, 0, (0, 0, 0)),
+        (4, BIRTH, 7, 5, (70, 80, 90)),
+        (5, DEATH, 6, 0, (0, 0, 0)),
+    ))
+    return lineage
+
+def test_unborn_id_below_capacity_is_unknown():
+    lineage = make_lineage()
+    assert lineage.summary("herbivore", 8) is None
+    assert lineage.summary("herbivore", 100) is None
+    assert lineage.parent("herbivore", 100) == 0
+    assert lineage.ancestors("herbivore", 100) == []
+    assert len(lineage.children("herbivore", 100)) == 0
+
+def test_spawned_organisms_have_no_parent_or_color():
+    lineage = make_lineage()
+    assert lineage.summary("herbivore", 1) is None # Never in an event
+    for id in (3, 4):
+        info = lineage.summary("herbivore", id)
+        assert info["parent"] == 0 and info["born"] == -1 and info["color"] is None
+    assert lineage.summary("herbivore", 3)["children"] == 2
+
+def test_family_tree():
+    lineage = make_lineage()
+    assert lineage.summary("herbivore", 7)["color"] == (70, 80, 90)
+    assert lineage.ancestors("herbivore", 7) == [5, 3]
+    assert sorted(lineage.descendants("herbivore", 3).tolist()) == [5, 6, 7]
+    assert lineage.summary("herbivore", 6)["died"] == 5
@@ -0,0 +1,33 @@
+import numpy as np
+from metrics import Metrics
+
+def add_ticks(metrics, start, stop):
+    for tick in range(start, stop):
+        metrics.add(tick, tick * 2, tick % 7, tick % 5, tick, tick // 2, tick // 3)
+
+def test_series_keeps_the_last_memory_ticks():
+    metrics = Metrics(memory=10, window=3)
+    add_ticks(metrics, 0, 37)
+    assert metrics.series("tick").tolist() == list(range(27, 37))
+    assert metrics.last("plants") == 72
+    assert metrics.max("herbivores") == 6
+
+def test_copy_unaffected_by_later_ticks():
+    metrics = Metrics(memory=10, window=3)
+    add_ticks(metrics, 0, 15)
+    snapshot = metrics.copy()
+    history = snapshot.series("plants").copy()
+    add_ticks(metrics, 15, 60) # Past the end of the buffer a few times
+    assert np.array_equal(snapshot.series("plants"), history)
+    assert snapshot.last("tick") == 14 and len(snapshot) == 10
+    assert metrics.series("tick").tolist() == list(range(50, 60))
+
+def test_state_round_trip():
+    metrics = Metrics(memory=10, window=3)
+    add_ticks(metrics, 0, 23)
+    restored = Metrics(memory=10, window=3)
+    restored.set_state(metrics.state())
+    add_ticks(metrics, 23, 41)
+    add_ticks(restored, 23, 41)
+    for name in ("tick", "plants", "pct_eaten"):
+        assert np.array_equal(restored.series(name), metrics.series(name))
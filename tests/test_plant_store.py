@@ -0,0 +1,29 @@
+import numpy as np
+from variables import PLANT_SPREAD_MIN
+from plant_store import crowded
+
+def test_rejected_plants_dont_crowd_later_ones():
+    # 0 is next to an existing plant, so 1 may grow next to 0. 2 is next to 1, which was placed
+    step = PLANT_SPREAD_MIN * 0.75
+    new_x = np.array([100.0, 100 + step, 100 + 2 * step])
+    new_y = np.full(3, 100.0)
+    too_close = crowded(new_x, new_y, np.array([100 - step]), np.array([100.0]), 1000, 1000)
+    assert too_close.tolist() == [True, False, True]
+
+def test_matches_placing_one_at_a_time():
+    rng = np.random.default_rng(3)
+    x, y = rng.uniform(0, 300, 40), rng.uniform(0, 300, 40)
+    new_x, new_y = rng.uniform(0, 300, 60), rng.uniform(0, 300, 60)
+    too_close = crowded(new_x, new_y, x, y, 300, 300)
+
+    placed_x, placed_y = list(x), list(y)
+    expected = []
+    for nx, ny in zip(new_x, new_y):
+        dx = (np.array(placed_x) - nx + 150) % 300 - 150
+        dy = (np.array(placed_y) - ny + 150) % 300 - 150
+        near = bool((dx * dx + dy * dy < PLANT_SPREAD_MIN ** 2).any())
+        expected.append(near)
+        if not near:
+            placed_x.append(nx)
+            placed_y.append(ny)
+    assert too_close.tolist() == expected
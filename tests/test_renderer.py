@@ -0,0 +1,53 @@
+import math
+import numpy as np
+from renderer import RasterRenderer, blend_cones, CONE_BUCKETS
+from world import World
+
+def test_cones_cover_the_canvas_triangle():
+    # Cones turned exactly to a bucket's rotation cover the pixels of the canvas polygon's triangle
+    frame = np.zeros((60, 80, 3), dtype=np.uint8)
+    sx, sy = np.array([20.0, 55.0]), np.array([30.0, 12.0])
+    rotation = np.array([3, 40]) * 2 * math.pi / CONE_BUCKETS
+    length, width = 18.0, 0.4
+    blend_cones(frame, sx, sy, rotation, length, width, np.array([0.25, 0.75]), np.array([0, 0, 200], dtype=np.float32))
+
+    cover = np.zeros((60, 80))
+    py, px = np.mgrid[0:60, 0:80]
+    for x, y, rot, alpha in zip(sx, sy, rotation, (0.25, 0.75)):
+        dx, dy = px - x, py - y
+        along = dx * math.cos(rot) + dy * math.sin(rot)
+        across = np.abs(dy * math.cos(rot) - dx * math.sin(rot))
+        cover += np.log1p(-alpha) * ((along >= 0) & (along <= length * math.cos(width)) & (across <= along * math.tan(width)))
+    expected = (200 * (1 - np.exp(cover)) + 0.5).astype(np.uint8)
+    assert np.abs(frame[:, :, 2].astype(int) - expected).max() <= 1
+    assert not frame[:, :, :2].any()
+
+def place(world, index, organism, x, y, rotation):
+    organism.x, organism.y, organism.rotation = x, y, rotation
+    index.move(organism)
+    return organism
+
+def test_paint_blends_cones_under_bodies():
+    world = World(400, 400, populate=False, seed=1)
+    world.create_random_herbivores(2)
+    herb, other = world.herbivores
+    length = herb.species.vision_length
+    place(world, world.herb_index, herb, 100.0, 100.0, 0.0)
+    place(world, world.herb_index, other, 100.0, 300.0, 0.0) # Spectated
+    frame = RasterRenderer(None).paint(world, 0, 0, 1.0, 400, 400, selected=other)
+
+    # Bodies on top, with a black facing line from the center
+    assert tuple(frame[101, 99]) == herb.color
+    assert tuple(frame[100, 101]) == (0, 0, 0)
+
+    # Blue cones in front only, darker for the spectated organism
+    ahead = int(100 + length / 2)
+    assert tuple(frame[100, ahead]) == (191, 191, 255)
+    assert tuple(frame[300, ahead]) == (64, 64, 255)
+    assert tuple(frame[100, int(100 - length / 2)]) == (255, 255, 255)
+    assert tuple(frame[200, ahead]) == (255, 255, 255)
+
+    # Overlapping cones darken like stacked stipples
+    place(world, world.herb_index, other, 100.0, 100.0, 0.0)
+    frame = RasterRenderer(None).paint(world, 0, 0, 1.0, 400, 400)
+    assert tuple(frame[100, ahead]) == (143, 143, 255)
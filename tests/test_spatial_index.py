@@ -0,0 +1,18 @@
+from spatial_index import SpatialIndex, grid
+
+class Point:
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+def test_cells_fit_the_field():
+    cols, rows, cell_w, cell_h = grid(6928, 2400, 200)
+    assert cols * cell_w == 6928 and rows * cell_h == 2400
+    assert cell_w >= 200 and cell_h >= 200
+
+def test_nearby_across_seam_of_uneven_field():
+    # 6928 isn't a multiple of the cell size, x=6790 and x=10 are 148 apart across the seam
+    index = SpatialIndex(6928, 2400, 200)
+    target = Point(10, 1200)
+    index.insert(target)
+    assert target in index.nearby(6790, 1200)
+    assert index.offset(6790, 1200, target.x, target.y) == (148, 0)
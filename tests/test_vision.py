@@ -0,0 +1,27 @@
+import numpy as np
+from spatial_index import SpatialIndex
+import vision
+
+class Point:
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+def test_candidate_pairs_across_seam_of_uneven_field():
+    obs, tgt = vision.candidate_pairs(np.array([6790.0]), np.array([1200.0]), np.array([10.0]), np.array([1200.0]), 6928, 2400)
+    assert list(zip(obs.tolist(), tgt.tolist())) == [(0, 0)]
+
+def test_candidate_pairs_match_index():
+    rng = np.random.default_rng(1)
+    field_w, field_h = 2191, 1517
+    ox, oy = rng.uniform(0, field_w, 200), rng.uniform(0, field_h, 200)
+    tx, ty = rng.uniform(0, field_w, 300), rng.uniform(0, field_h, 300)
+    index = SpatialIndex(field_w, field_h)
+    points = [Point(x, y) for x, y in zip(tx.tolist(), ty.tolist())]
+    for p in points:
+        index.insert(p)
+    position = {id(p): i for i, p in enumerate(points)}
+
+    obs, tgt = vision.candidate_pairs(ox, oy, tx, ty, field_w, field_h)
+    for i in range(len(ox)):
+        expected = sorted(position[id(p)] for p in index.nearby(ox[i], oy[i]))
+        assert sorted(tgt[obs == i].tolist()) == expected
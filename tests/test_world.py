@@ -0,0 +1,25 @@
+from world import World
+
+def ids(world):
+    return [o.id for o in world.herbivores], [o.id for o in world.carnivores], [p.id for p in world.plants]
+
+def test_worlds_number_their_own_ids():
+    first = World(700, 700, seed=5)
+    for _ in range(10):
+        first.step()
+    before = ids(first)
+    next_ids = dict(first.next_ids), first.plants.next_id
+
+    second = World(700, 700, seed=5)
+    assert ids(second)[0][0] == 1 and ids(second)[2][0] == 1
+    assert ids(first) == before
+    assert (dict(first.next_ids), first.plants.next_id) == next_ids
+
+    # Stepping the second world in between doesn't change how the first numbers its births
+    for _ in range(10):
+        second.step()
+        first.step()
+    alone = World(700, 700, seed=5)
+    for _ in range(20):
+        alone.step()
+    assert ids(first) == ids(alone)
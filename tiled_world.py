@@ -0,0 +1,147 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from variables import *
+from vector_world import VectorWorld
+import vision
+from spatial_index import grid
+
+# ----------------------
+# TiledWorld
+# ----------------------
+# VectorWorld for very large fields. The field is cut into tiles of whole
+# cell rows (see spatial_index.grid) and the spatial searches of every tick (vision and
+# eating contacts) run for all tiles at once in a pool of worker processes.
+# A tile's worker handles the observers inside the tile and only looks at
+# targets inside it plus one cell of halo around it, which is everything
+# vision.candidate_pairs can reach. The inputs of a search are copied into
+# shared memory instead of being pickled, and everything that changes the
+# world (births, deaths, eating, movement) stays in this process, so a
+# TiledWorld follows exactly the same rules as a VectorWorld with the same seed.
+class TiledWorld(VectorWorld):
+    def __init__(self, field_w=SYS_FIELD_WIDTH, field_h=SYS_FIELD_HEIGHT, populate=True, seed=None, processes=None, tiles=None):
+        super().__init__(field_w, field_h, populate, seed)
+        processes = processes or multiprocessing.cpu_count()
+        rows = grid(field_w, field_h, SYS_CELL_SIZE)[1]
+
+        # Tiles as ranges of cell rows, about the same height each
+        count = max(1, min(tiles or processes, rows))
+        bounds = np.linspace(0, rows, count + 1).round().astype(int)
+        self.tiles = [(int(r0), int(r1)) for r0, r1 in zip(bounds[:-1], bounds[1:]) if r1 > r0]
+        self.rows = rows
+
+        self.shared = SharedArrays()
+        ctx = multiprocessing.get_context("spawn")
+        self.pool = ctx.Pool(processes, initializer=init_worker, initargs=(SYS_CELL_SIZE,))
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.shared.close()
+
+    # ------------------ Queries ------------------
+    def nearest_in_cone(self, ox, oy, rotation, tx, ty, length, width):
+        if len(ox) == 0 or len(tx) == 0:
+            return super().nearest_in_cone(ox, oy, rotation, tx, ty, length, width)
+
+        name, layout = self.shared.publish({
+            "ox": ox, "oy": oy, "rotation": rotation, "tx": tx, "ty": ty,
+            "target": np.full(len(ox), -1, dtype=np.int64),
+        })
+        self.pool.map(tile_nearest_in_cone, [(name, layout, r0, r1, self.rows, length, width, self.field_w, self.field_h)
+                                             for r0, r1 in self.tiles])
+        target = self.shared.arrays(layout)["target"].copy()
+        return target >= 0, np.maximum(target, 0)
+
+    def contacts(self, ox, oy, tx, ty, reach):
+        if len(ox) == 0 or len(tx) == 0:
+            return super().contacts(ox, oy, tx, ty, reach)
+
+        name, layout = self.shared.publish({"ox": ox, "oy": oy, "tx": tx, "ty": ty})
+        results = self.pool.map(tile_contacts, [(name, layout, r0, r1, self.rows, reach, self.field_w, self.field_h)
+                                                for r0, r1 in self.tiles])
+
+        # An observer belongs to one tile only, so a stable sort restores the serial order
+        obs = np.concatenate([r[0] for r in results])
+        tgt = np.concatenate([r[1] for r in results])
+        order = np.argsort(obs, kind="stable")
+        return obs[order], tgt[order]
+
+# ----------------------
+# SharedArrays
+# ----------------------
+# One shared memory block that a set of named arrays is copied into. It's
+# reused while big enough and replaced by one twice the size when it isn't.
+class SharedArrays:
+    def __init__(self):
+        self.shm = None
+
+    def publish(self, arrays):
+        total = sum(a.nbytes for a in arrays.values())
+        if self.shm is None or self.shm.size < total:
+            size = max(total, 2 * self.shm.size if self.shm is not None else 1 << 20)
+            self.close()
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+        layout = []
+        offset = 0
+        for key, a in arrays.items():
+            layout.append((key, offset, a.shape, a.dtype.str))
+            offset += a.nbytes
+        for key, view in self.arrays(layout).items():
+            view[...] = arrays[key]
+        return self.shm.name, layout
+
+    def arrays(self, layout):
+        return as_arrays(self.shm, layout)
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+def as_arrays(shm, layout):
+    return {key: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset) for key, offset, shape, dtype in layout}
+
+# ------------------ Worker processes ------------------
+_attached = {}
+
+def init_worker(cell_size):
+    # Spawned workers import variables.py fresh, keep the parent's cell size in case it was changed
+    vision.SYS_CELL_SIZE = cell_size
+
+def attach(name):
+    shm = _attached.get(name)
+    if shm is None:
+        # The parent replaced its block, so the previous one is gone
+        for old in _attached.values():
+            old.close()
+        _attached.clear()
+        shm = _attached[name] = shared_memory.SharedMemory(name=name)
+    return shm
+
+def in_rows(y, r0, r1, rows, halo, field_h):
+    # Whether each y is within cell rows [r0 - halo, r1 + halo), wrapping around the field
+    span = r1 - r0 + 2 * halo
+    if span >= rows:
+        return np.ones(len(y), dtype=bool)
+    row = (y // (field_h / rows)).astype(np.int64) % rows
+    return (row - (r0 - halo)) % rows < span
+
+def tile_nearest_in_cone(task):
+    name, layout, r0, r1, rows, length, width, field_w, field_h = task
+    a = as_arrays(attach(name), layout)
+    mine = np.flatnonzero(in_rows(a["oy"], r0, r1, rows, 0, field_h))
+    near = np.flatnonzero(in_rows(a["ty"], r0, r1, rows, 1, field_h))
+    seen, target = vision.nearest_in_cone(a["ox"][mine], a["oy"][mine], a["rotation"][mine],
+                                          a["tx"][near], a["ty"][near], length, width, field_w, field_h)
+    a["target"][mine] = np.where(seen, near[target], -1)
+
+def tile_contacts(task):
+    name, layout, r0, r1, rows, reach, field_w, field_h = task
+    a = as_arrays(attach(name), layout)
+    mine = np.flatnonzero(in_rows(a["oy"], r0, r1, rows, 0, field_h))
+    near = np.flatnonzero(in_rows(a["ty"], r0, r1, rows, 1, field_h))
+    obs, tgt = vision.contacts(a["ox"][mine], a["oy"][mine], a["tx"][near], a["ty"][near], reach, field_w, field_h)
+    return mine[obs], near[tgt]
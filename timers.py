@@ -0,0 +1,65 @@
+import time
+
+# ----------------------
+# PhaseTimer
+# ----------------------
+# Adds up the time spent in each phase of a tick. `start` marks the beginning
+# of a tick and every `lap(name)` charges the time since the previous mark to
+# that phase, so timing a tick costs one perf_counter call per phase. Worlds
+# lap their phases while a timer is set as their `timer`.
+class PhaseTimer:
+    def __init__(self):
+        self.totals = {}
+        self.last = time.perf_counter()
+
+    def start(self):
+        self.last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.totals[name] = self.totals.get(name, 0.0) + now - self.last
+        self.last = now
+
+    def add(self, name, seconds):
+        # For time measured separately, like a part of another phase
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+    def reset(self):
+        self.totals = {}
+
+def timed(timer, name, function):
+    # function, charging the time of every call to name
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timer.add(name, time.perf_counter() - start)
+    return wrapper
+
+# ----------------------
+# RollingTimer
+# ----------------------
+# PhaseTimer that also keeps a moving average of every phase's time per frame
+# (or per tick), for live displays. Call `end_frame` once a frame is done.
+class RollingTimer(PhaseTimer):
+    def __init__(self, smoothing=0.1):
+        super().__init__()
+        self.smoothing = smoothing
+        self.marks = {}
+        self.averages = {}
+
+    def end_frame(self):
+        for name, total in self.totals.items():
+            value = total - self.marks.get(name, 0.0)
+            self.averages[name] = moving_average(self.averages.get(name), value, self.smoothing)
+        self.marks = dict(self.totals)
+
+    def reset(self):
+        super().reset()
+        self.marks = {}
+        self.averages = {}
+
+def moving_average(average, value, smoothing=0.1):
+    # Exponential moving average, starting at the first value
+    return value if average is None else average + smoothing * (value - average)
@@ -9,11 +9,27 @@ SYS_START_HERB_NUM = 200
 SYS_START_CARN_NUM = 80
 SYS_GRAPH_MEMORY = 100000   # Amount of ticks visible on the graph
 SYS_DEATH_WINDOW_SIZE = 50  # Amount of ticks used to calculate death cause percentage
+SYS_GRAPH_REFRESH_INTERVAL = 5  # GUI frames between graph updates
+SYS_GRAPH_BLIT = True       # Only redraw the graph lines between full graph redraws. Turn off if the graphs display incorrectly
 SYS_SPEED_LEVELS = [0, 1, 2, 4, 8, 16, 32]
+SYS_SPEED_UNLIMITED = math.inf  # Speed level past the last one, ticks as fast as the simulation can
+SYS_TICK_RATE = 10          # Ticks per second at 1x speed
+SYS_FPS = 30                # Frames per second the GUI redraws at, independent of the speed
 SYS_MAX_CLICK_DIST = 20     # Units away from an organism you can click on it from
+SYS_POOL_SIZE = 1000        # Dead organisms kept per species for newborns to reuse instead of allocating new ones
+SYS_NEW_ITEMS_PER_FRAME = 200 # Organisms the canvas renderer creates items for per frame at most, the rest get theirs over the next frames
+SYS_CHECKPOINT_INTERVAL = 0 # Ticks between the GUI's automatic checkpoints (see checkpoint.py), 0 to turn them off
+SYS_CHECKPOINT_PATH = "checkpoint.npz" # File those checkpoints are written to
+SYS_EXPORT_PATH = ""        # Where the GUI streams per-tick data to as it runs (see export.py): a .csv file, a directory of .npy chunks otherwise, "" for off
+SYS_RENDERER = "canvas"     # "canvas" draws every organism as Tk canvas items, "raster" paints the field into a single image each frame (faster for big worlds)
+SYS_PROFILER_PANEL = False  # Show tick/frame timings and counters above the graphs at startup, F3 toggles it
+SYS_PROFILE_TICKS = 200     # Ticks recorded by the profiler panel's "Profile" button
+SYS_PROFILE_PATH = "profile.prof" # cProfile stats file it writes, open with pstats or snakeviz
+SYS_JIT = True              # Use the numba-compiled kernels of kernels.py in the array engine when numba is installed
 
 # NEURAL NETWORK VARIABLES
 NN_MUTATION_RATE = 0.05     # Amount each weight is allowed to fluctuate per generation
+NN_ACTIVATION = "exact"     # "exact" sigmoid, or "fast": an approximation without exp (see neural_network.py). Runs play out differently with each
 
 # PLANT VARIABLES
 PLANT_START_COLOR_R_0 = 0
@@ -0,0 +1,217 @@
+import numpy as np
+from variables import *
+from metrics import Metrics
+from plant_store import PlantStore
+from species import HERBIVORE, CARNIVORE
+from population import Population, STARVATION, EATEN, OLD_AGE, DEATH_CAUSES
+from streams import ArrayStreams
+import vision
+import kernels
+
+# ----------------------
+# VectorWorld
+# ----------------------
+# Array-backed counterpart of world.World. Herbivores and carnivores live in
+# Population stores and the per-organism bookkeeping (aging, metabolism,
+# deaths, gestation, rotation and movement) runs in bulk with NumPy.
+class VectorWorld:
+    def __init__(self, field_w=SYS_FIELD_WIDTH, field_h=SYS_FIELD_HEIGHT, populate=True, seed=None):
+        self.field_w, self.field_h = field_w, field_h
+        self.streams = ArrayStreams(seed)
+        self.seed = self.streams.seed
+        self.events = None # A replay.ReplayLog while recording
+        self.export = None # An export.MetricsWriter while exporting
+        self.timer = None # A timers.PhaseTimer while timing ticks
+
+        # State
+        self.tick_count = 0
+        self.metrics = Metrics()
+        self.plants = PlantStore()
+        self.herbivores = Population(HERBIVORE)
+        self.carnivores = Population(CARNIVORE)
+
+        # Create objects
+        if populate:
+            self.plants.spawn_random(SYS_START_PLANT_NUM, self.streams, self.field_w, self.field_h)
+            self.herbivores.spawn_random(SYS_START_HERB_NUM, self.streams, self.field_w, self.field_h)
+            self.carnivores.spawn_random(SYS_START_CARN_NUM, self.streams, self.field_w, self.field_h)
+
+    # ------------------ Tick ------------------
+    def step(self):
+        if self.events is not None:
+            self.events.tick = self.tick_count
+
+        timer = self.timer
+        if timer is not None:
+            timer.start()
+
+        # Update all organisms
+        self.plants.duplicate(self.streams.plants, self.field_w, self.field_h)
+        if timer is not None:
+            timer.lap("plants")
+        self.update_population(self.herbivores, self.herbivore_inputs, self.herbivores_eat)
+        if timer is not None:
+            timer.lap("herbivores")
+        self.update_population(self.carnivores, self.carnivore_inputs, self.carnivores_eat)
+        if timer is not None:
+            timer.lap("carnivores")
+        self.herbivores.compact()
+        self.carnivores.compact()
+        if timer is not None:
+            timer.lap("cleanup")
+
+        # Update data
+        self.update_data()
+        if timer is not None:
+            timer.lap("stats")
+
+    def update_population(self, pop, get_inputs, eat):
+        if self.events is not None:
+            was_alive = pop.alive[:pop.size].copy()
+        pop.age_and_metabolize()
+        if self.events is not None:
+            died = np.flatnonzero(was_alive & ~pop.alive[:pop.size])
+            self.events.deaths(pop.species.name, pop.id[died], pop.death_cause[died], pop.age[died], pop.energy[died])
+
+        # Gestation
+        parents = pop.gestate()
+        children = pop.give_birth(parents, self.streams, self.field_w, self.field_h)
+        if self.events is not None:
+            self.events.births(pop.species.name, pop.id[children], pop.id[parents], pop.color[children])
+
+        # Brain
+        idx = pop.living()
+        inputs = get_inputs(idx)
+        rotate_out, move_out = pop.think(idx, inputs)
+
+        # Rotation & movement
+        pop.move(idx, rotate_out, move_out, self.field_w, self.field_h)
+
+        # Eating
+        eat(idx[~pop.gestating[idx]])
+
+    def is_over(self):
+        return len(self.herbivores) == 0 or len(self.carnivores) == 0 or len(self.plants) == 0
+
+    # ------------------ Queries ------------------
+    # Every spatial search of a tick goes through these two, so a subclass can run them elsewhere
+    def nearest_in_cone(self, ox, oy, rotation, tx, ty, length, width):
+        return vision.nearest_in_cone(ox, oy, rotation, tx, ty, length, width, self.field_w, self.field_h)
+
+    def contacts(self, ox, oy, tx, ty, reach):
+        return vision.contacts(ox, oy, tx, ty, reach, self.field_w, self.field_h)
+
+    # ------------------ Vision ------------------
+    def look(self, pop, idx, target_x, target_y, target_color, inputs, blind):
+        # Fill the RGB inputs of the still blind observers with the closest target they can see
+        sp = pop.species
+        rows = np.flatnonzero(blind)
+        seen, target = self.nearest_in_cone(
+            pop.x[idx[rows]], pop.y[idx[rows]], pop.rotation[idx[rows]],
+            target_x, target_y, sp.vision_length, sp.vision_width)
+        inputs[rows[seen], :3] = target_color[target[seen]] / 255
+        blind[rows[seen]] = False
+
+    def herbivore_inputs(self, idx):
+        herbs, carns = self.herbivores, self.carnivores
+        inputs = np.full((len(idx), 4), -1.0)
+        blind = np.ones(len(idx), dtype=bool)
+
+        # Carnivores take priority over plants
+        carn_idx = carns.living()
+        self.look(herbs, idx, carns.x[carn_idx], carns.y[carn_idx], carns.color[carn_idx], inputs, blind)
+        plants = self.plants
+        self.look(herbs, idx, plants.x[:plants.size], plants.y[:plants.size], plants.color[:plants.size], inputs, blind)
+
+        inputs[:, 3] = np.clip(herbs.energy[idx] / HERB_REPRODUCTION_THRESHOLD, 0.0, 1.0)
+        return inputs
+
+    def carnivore_inputs(self, idx):
+        herbs, carns = self.herbivores, self.carnivores
+        inputs = np.full((len(idx), 4), -1.0)
+        blind = np.ones(len(idx), dtype=bool)
+
+        herb_idx = herbs.living()
+        self.look(carns, idx, herbs.x[herb_idx], herbs.y[herb_idx], herbs.color[herb_idx], inputs, blind)
+
+        inputs[:, 3] = np.clip(carns.energy[idx] / CARN_REPRODUCTION_THRESHOLD, 0.0, 1.0)
+        return inputs
+
+    # ------------------ Eating ------------------
+    def claims(self, ox, oy, tx, ty, obs, tgt, count):
+        # Which contact pairs get their target: the closest observer wins, the first pair on ties,
+        # so every target is eaten at most once whatever order the pairs came in
+        dx, dy = vision.offsets(ox[obs], oy[obs], tx[tgt], ty[tgt], self.field_w, self.field_h)
+        order = np.lexsort((np.arange(len(obs)), dx*dx + dy*dy))
+        if kernels.ENABLED:
+            first = order[kernels.first_claims(tgt[order], count)]
+        else:
+            first = order[np.unique(tgt[order], return_index=True)[1]]
+        won = np.zeros(len(obs), dtype=bool)
+        won[first] = True
+        return won
+
+    def herbivores_eat(self, idx):
+        herbs = self.herbivores
+        plants = self.plants
+        ox, oy = herbs.x[idx], herbs.y[idx]
+        tx, ty = plants.x[:plants.size], plants.y[:plants.size]
+        obs, tgt = self.contacts(ox, oy, tx, ty, HERBIVORE.radius + PLANT_SIZE / 2)
+
+        won = self.claims(ox, oy, tx, ty, obs, tgt, len(plants))
+        fed, meals = idx[obs[won]], tgt[won]
+        np.add.at(herbs.energy, fed, HERB_ENERGY_GAIN)
+
+        if self.events is not None:
+            self.events.eats(HERBIVORE.name, herbs.id[fed], plants.id[meals])
+        if len(fed):
+            plants.remove(meals)
+        herbs.start_gestation(np.unique(fed))
+
+    def carnivores_eat(self, idx):
+        herbs, carns = self.herbivores, self.carnivores
+        herb_idx = herbs.living()
+        ox, oy = carns.x[idx], carns.y[idx]
+        tx, ty = herbs.x[herb_idx], herbs.y[herb_idx]
+        obs, tgt = self.contacts(ox, oy, tx, ty, CARNIVORE.radius + HERBIVORE.radius / 1.2) # divisor of 1 is a big hitbox, 2 is a small hitbox
+
+        won = self.claims(ox, oy, tx, ty, obs, tgt, len(herb_idx))
+        fed, meals = idx[obs[won]], herb_idx[tgt[won]]
+        np.add.at(carns.energy, fed, herbs.energy[meals] * CARN_ENERGY_GAIN_PERCENT)
+        herbs.kill(meals, EATEN)
+
+        if self.events is not None:
+            self.events.eats(CARNIVORE.name, carns.id[fed], herbs.id[meals])
+            self.events.deaths(HERBIVORE.name, herbs.id[meals], EATEN, herbs.age[meals], herbs.energy[meals])
+
+        carns.start_gestation(np.unique(fed))
+
+    # ------------------ Data ------------------
+    def update_data(self):
+        herb_deaths = self.herbivores.deaths
+        self.metrics.add(
+            self.tick_count,
+            len(self.plants),
+            len(self.herbivores),
+            len(self.carnivores),
+            herb_deaths[STARVATION],
+            herb_deaths[EATEN],
+            herb_deaths[OLD_AGE],
+        )
+        if self.export is not None:
+            self.export.add(self.export_row())
+
+        self.tick_count += 1
+
+    def export_row(self):
+        row = {"tick": self.tick_count, "plants": len(self.plants), "herbivores": len(self.herbivores), "carnivores": len(self.carnivores)}
+        for prefix, pop in (("herb", self.herbivores), ("carn", self.carnivores)):
+            for cause, name in DEATH_CAUSES.items():
+                row[f"{prefix}_{name}"] = pop.deaths[cause]
+            idx = pop.living()
+            n = max(len(idx), 1) # Zeros once a species has died out
+            row[prefix + "_energy"] = pop.energy[idx].sum() / n
+            row[prefix + "_generation"] = pop.generation[idx].sum() / n
+            for i, channel in enumerate("rgb"):
+                row[f"{prefix}_{channel}"] = pop.color[idx, i].sum(dtype=np.float64) / n
+        return row
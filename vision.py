@@ -0,0 +1,88 @@
+import numpy as np
+from variables import *
+import kernels
+from spatial_index import grid
+
+# ----------------------
+# Batched vision
+# ----------------------
+# Answers "what is the closest target inside each observer's vision cone" for
+# a whole population at once. Observers and targets are given as coordinate
+# arrays, so the same code serves herbivores looking at carnivores or plants
+# and carnivores looking at herbivores.
+
+def candidate_pairs(ox, oy, tx, ty, field_w, field_h):
+    # Every (observer, target) pair where the target is in one of the 9 cells around the
+    # observer. Cells are laid out and wrap around the field edges like spatial_index.SpatialIndex
+    cols, rows, cell_w, cell_h = grid(field_w, field_h, SYS_CELL_SIZE)
+
+    # Sort targets by cell so each cell is one contiguous run
+    tcell = (ty // cell_h).astype(np.int64) % rows * cols + (tx // cell_w).astype(np.int64) % cols
+    order = np.argsort(tcell, kind="stable")
+    sorted_cells = tcell[order]
+
+    ocx = (ox // cell_w).astype(np.int64) % cols
+    ocy = (oy // cell_h).astype(np.int64) % rows
+    if kernels.ENABLED:
+        cell_start = np.zeros(cols * rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tcell, minlength=cols * rows), out=cell_start[1:])
+        return kernels.cell_pairs(ocx, ocy, cell_start, order, cols, rows)
+    observers = np.arange(len(ox))
+
+    obs_parts, tgt_parts = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            cell = (ocy + dy) % rows * cols + (ocx + dx) % cols
+            start = np.searchsorted(sorted_cells, cell, side="left")
+            end = np.searchsorted(sorted_cells, cell, side="right")
+            counts = end - start
+
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            first = np.repeat(start - (np.cumsum(counts) - counts), counts)
+            obs_parts.append(np.repeat(observers, counts))
+            tgt_parts.append(order[first + np.arange(total)])
+
+    if not obs_parts:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(obs_parts), np.concatenate(tgt_parts)
+
+def offsets(x0, y0, x1, y1, field_w, field_h):
+    # Shortest (dx, dy) from (x0, y0) to (x1, y1) on the wrapping field
+    return (x1 - x0 + field_w / 2) % field_w - field_w / 2, (y1 - y0 + field_h / 2) % field_h - field_h / 2
+
+def contacts(ox, oy, tx, ty, reach, field_w, field_h):
+    # (observer, target) pairs closer than reach, ordered by observer
+    obs, tgt = candidate_pairs(ox, oy, tx, ty, field_w, field_h)
+    dx, dy = offsets(ox[obs], oy[obs], tx[tgt], ty[tgt], field_w, field_h)
+    touching = dx*dx + dy*dy < reach * reach
+    obs, tgt = obs[touching], tgt[touching]
+    order = np.argsort(obs, kind="stable")
+    return obs[order], tgt[order]
+
+def nearest_in_cone(ox, oy, rotation, tx, ty, length, width, field_w, field_h):
+    # Returns (seen, target): whether each observer sees anything, and the index of the closest target it sees
+    seen = np.zeros(len(ox), dtype=bool)
+    target = np.zeros(len(ox), dtype=np.int64)
+    if len(ox) == 0 or len(tx) == 0:
+        return seen, target
+
+    obs, tgt = candidate_pairs(ox, oy, tx, ty, field_w, field_h)
+    dx, dy = offsets(ox[obs], oy[obs], tx[tgt], ty[tgt], field_w, field_h)
+    dist2 = dx*dx + dy*dy
+
+    # Inside the cone when the angle to the target is under width, i.e. dot(facing, d) > |d| * cos(width)
+    dot = dx * np.cos(rotation[obs]) + dy * np.sin(rotation[obs])
+    visible = (dist2 < length * length) & (dot > np.sqrt(dist2) * math.cos(width))
+    obs, tgt, dist2 = obs[visible], tgt[visible], dist2[visible]
+
+    # Closest visible target per observer
+    order = np.lexsort((dist2, obs))
+    obs, tgt = obs[order], tgt[order]
+    first = np.ones(len(obs), dtype=bool)
+    first[1:] = obs[1:] != obs[:-1]
+    seen[obs[first]] = True
+    target[obs[first]] = tgt[first]
+    return seen, target
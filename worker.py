@@ -0,0 +1,148 @@
+import cProfile
+import copy
+import threading
+import time
+from variables import *
+from spatial_index import SpatialIndex
+import checkpoint
+from timers import RollingTimer
+
+# ----------------------
+# Snapshot
+# ----------------------
+# Frozen copy of everything the GUI reads from a World: the organisms (shallow
+# copies, their networks never change after birth and their inputs and
+# network activations are new lists every tick), the indexes the renderers
+# cull with and the graph history, whose buffer is shared (see Metrics.copy).
+# Plants never move or change color, so the plant index only copies which
+# plants exist.
+class Snapshot:
+    def __init__(self, world):
+        self.field_w, self.field_h = world.field_w, world.field_h
+        self.tick_count = world.tick_count
+        self.metrics = world.metrics.copy()
+        self.over = world.is_over()
+
+        self.plant_index = world.plant_index.copy()
+        self.herbivores = [copy.copy(o) for o in world.herbivores]
+        self.carnivores = [copy.copy(o) for o in world.carnivores]
+        self.herb_index = SpatialIndex(world.field_w, world.field_h)
+        self.carn_index = SpatialIndex(world.field_w, world.field_h)
+        for organism in self.herbivores:
+            self.herb_index.insert(organism)
+        for organism in self.carnivores:
+            self.carn_index.insert(organism)
+        self.organisms = {(type(o), o.id): o for o in self.herbivores + self.carnivores}
+
+        # For the profiler panel: when this was taken, ms per tick phase and spatial query totals
+        self.time = time.perf_counter()
+        self.phase_ms = {name: s * 1000 for name, s in world.timer.averages.items()} if world.timer is not None else {}
+        indexes = (world.plant_index, world.herb_index, world.carn_index)
+        self.queries = sum(index.queries for index in indexes)
+        self.examined = sum(index.examined for index in indexes)
+
+    def is_over(self):
+        return self.over
+
+    def find(self, organism):
+        # This snapshot's copy of an organism from an earlier snapshot, None once it died
+        if organism is None:
+            return None
+        return self.organisms.get((type(organism), organism.id))
+
+# ----------------------
+# SimulationWorker
+# ----------------------
+# Steps a World on a background thread at SYS_TICK_RATE * speed ticks per
+# second (as fast as possible for SYS_SPEED_UNLIMITED) and publishes a new
+# Snapshot at most SYS_FPS times a second. Only this thread touches the world
+# once started, the GUI only ever reads `snapshot`. Automatic checkpoints are
+# saved from this thread too, every SYS_CHECKPOINT_INTERVAL ticks, and the
+# world's tick phases are always timed for the profiler panel.
+class SimulationWorker:
+    def __init__(self, world, fps=SYS_FPS):
+        self.world = world
+        if world.timer is None:
+            world.timer = RollingTimer()
+        self.frame_time = 1 / fps
+        self.speed = 1
+        self.snapshot = Snapshot(world)
+        self.running = False
+        self.thread = None
+
+        # cProfile of a window of ticks, see profile()
+        self.profile_request = None
+        self.profiler = None
+        self.profile_ticks = 0
+        self.profile_path = None
+        self.profiled = None # Path of the last finished profile
+
+    def profile(self, ticks, path):
+        # Profile the next `ticks` ticks and write the stats to path (pstats / snakeviz format)
+        self.profile_request = (ticks, path)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        next_tick = time.perf_counter()
+        last_publish = next_tick
+        while self.running and not self.world.is_over():
+            now = time.perf_counter()
+            speed = self.speed
+
+            # Paused or ahead of schedule: sleep, but never longer than a frame so speed changes apply quickly
+            if speed == 0:
+                time.sleep(self.frame_time)
+                next_tick = time.perf_counter()
+                continue
+            if now < next_tick:
+                time.sleep(min(next_tick - now, self.frame_time))
+                continue
+
+            self.step()
+            if SYS_CHECKPOINT_INTERVAL and self.world.tick_count % SYS_CHECKPOINT_INTERVAL == 0:
+                checkpoint.save(self.world, SYS_CHECKPOINT_PATH)
+
+            # Falling behind doesn't build up a backlog of ticks to catch up on
+            next_tick = max(next_tick + 1 / (SYS_TICK_RATE * speed), now - self.frame_time)
+
+            if now - last_publish >= self.frame_time:
+                self.snapshot = Snapshot(self.world)
+                last_publish = now
+
+        self.snapshot = Snapshot(self.world)
+        if self.world.export is not None:
+            self.world.export.flush()
+        if self.profiler is not None:
+            self.finish_profile()
+        self.running = False
+
+    def step(self):
+        if self.profile_request is not None and self.profiler is None:
+            (self.profile_ticks, self.profile_path), self.profile_request = self.profile_request, None
+            self.profiler = cProfile.Profile()
+
+        if self.profiler is not None:
+            self.profiler.enable()
+            self.world.step()
+            self.profiler.disable()
+            self.profile_ticks -= 1
+            if self.profile_ticks <= 0:
+                self.finish_profile()
+        else:
+            self.world.step()
+        self.world.timer.end_frame()
+
+    def finish_profile(self):
+        self.profiler.dump_stats(self.profile_path)
+        self.profiler = None
+        self.profiled = self.profile_path
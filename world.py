@@ -0,0 +1,308 @@
+import numpy as np
+from variables import *
+from metrics import Metrics
+from plant import Plant, PlantSet
+from herbivore import Herbivore
+from carnivore import Carnivore
+from spatial_index import SpatialIndex
+from streams import Streams
+import neural_network
+from neural_network import NeuralNetwork, ACTIVATIONS, mutated
+
+# ----------------------
+# World
+# ----------------------
+# Holds the whole simulation state and advances it one tick at a time.
+# Nothing in here touches tkinter or matplotlib, so a World can be run headless
+# or have the GUI in EvolutionSimulatorOfVision.py attached to it as a viewer.
+# Two worlds made with the same seed play out exactly the same.
+class World:
+    def __init__(self, field_w=SYS_FIELD_WIDTH, field_h=SYS_FIELD_HEIGHT, populate=True, seed=None):
+        self.field_w, self.field_h = field_w, field_h
+
+        # Randomness, see streams.py. Every world numbers its organisms (and PlantSet its plants) from 1,
+        # so seeded runs number everything the same way however many worlds a process makes
+        self.streams = Streams(seed)
+        self.seed = self.streams.seed
+        self.next_ids = {Herbivore: 1, Carnivore: 1}
+        self.events = None # A replay.ReplayLog while recording
+        self.export = None # An export.MetricsWriter while exporting
+        self.timer = None # A timers.PhaseTimer while timing ticks
+
+        # State
+        self.tick_count = 0
+        self.metrics = Metrics()
+        self.carnivores, self.herbivores, self.plants = [], [], PlantSet()
+        self.herb_deaths = {"starvation": 0, "eaten": 0, "old_age": 0}
+        self.carn_deaths = {"starvation": 0, "eaten": 0, "old_age": 0}
+        self.plant_index = SpatialIndex(field_w, field_h)
+        self.herb_index = SpatialIndex(field_w, field_h)
+        self.carn_index = SpatialIndex(field_w, field_h)
+        self.pools = {Herbivore: [], Carnivore: []} # Dead organisms, reused for newborns
+
+        # Create objects
+        if populate:
+            self.create_random_plants(SYS_START_PLANT_NUM)
+            self.create_random_herbivores(SYS_START_HERB_NUM)
+            self.create_random_carnivores(SYS_START_CARN_NUM)
+
+    # ------------------ Organisms & Plants ------------------
+    def create_random_herbivores(self, count):
+        rng = self.streams.spawn
+        for _ in range(count):
+            x = rng.randint(50, self.field_w-50)
+            y = rng.randint(50, self.field_h-50)
+            herb = Herbivore(x, y, streams=self.streams, id=self.new_id(Herbivore))
+            self.herbivores.append(herb)
+            self.herb_index.insert(herb)
+
+    def create_random_carnivores(self, count):
+        rng = self.streams.spawn
+        for _ in range(count):
+            x = rng.randint(50, self.field_w-50)
+            y = rng.randint(50, self.field_h-50)
+            carn = Carnivore(x, y, streams=self.streams, id=self.new_id(Carnivore))
+            self.carnivores.append(carn)
+            self.carn_index.insert(carn)
+
+    def create_random_plants(self, count):
+        rng = self.streams.spawn
+        for _ in range(count):
+            x = rng.randint(20, self.field_w-20)
+            y = rng.randint(20, self.field_h-20)
+            plant = Plant(x, y, rng=self.streams.plants)
+            self.plants.add(plant)
+            self.plant_index.insert(plant)
+
+    def new_id(self, cls):
+        id = self.next_ids[cls]
+        self.next_ids[cls] = id + 1
+        return id
+
+    # ------------------ Tick ------------------
+    def reindex(self, index, organism):
+        # Follow an organism after its update, dropping it once it has died
+        if organism.alive:
+            index.move(organism)
+        else:
+            index.remove(organism)
+
+    def step(self):
+        if self.events is not None:
+            self.events.tick = self.tick_count
+
+        timer = self.timer
+        if timer is not None:
+            timer.start()
+
+        # Update all organisms
+        for plant in self.plants.advance():
+            plant.duplicate(self.plants, self.plant_index, self.field_w, self.field_h, self.streams.plants)
+        if timer is not None:
+            timer.lap("plants")
+        births = []
+        for herb in self.herbivores:
+            herb.update(self.field_w, self.field_h, self.plant_index, self.herb_index, self.carn_index, births)
+            self.reindex(self.herb_index, herb)
+        self.give_birth(Herbivore, births, self.herbivores, self.herb_index)
+        self.herbivores_eat()
+        if timer is not None:
+            timer.lap("herbivores")
+        births = []
+        for carn in self.carnivores:
+            carn.update(self.field_w, self.field_h, self.plant_index, self.herb_index, self.carn_index, births)
+            self.reindex(self.carn_index, carn)
+        self.give_birth(Carnivore, births, self.carnivores, self.carn_index)
+        self.carnivores_eat()
+        if timer is not None:
+            timer.lap("carnivores")
+        self.herbivores = self.remove_dead(self.herbivores, self.herb_deaths, self.pools[Herbivore])
+        self.carnivores = self.remove_dead(self.carnivores, self.carn_deaths, self.pools[Carnivore])
+        if timer is not None:
+            timer.lap("cleanup")
+
+        # Update data
+        self.update_data()
+        if timer is not None:
+            timer.lap("stats")
+
+    # ------------------ Births ------------------
+    def give_birth(self, cls, parents, organisms, index):
+        # A child for every parent whose gestation ended this tick, all made at once: where they're
+        # born, their colors, rotations, lifespans and network mutations are drawn as arrays
+        count = len(parents)
+        if count == 0:
+            return
+        sp = cls.species
+        rng = self.streams.births
+        x = ((np.array([p.x for p in parents]) + rng.integers(-20, 21, size=count)) % self.field_w).tolist()
+        y = ((np.array([p.y for p in parents]) + rng.integers(-20, 21, size=count)) % self.field_h).tolist()
+        mutate = rng.integers(-sp.color_mutate_rand, sp.color_mutate_rand + 1, size=(count, 3))
+        colors = np.clip(np.array([p.color for p in parents]) + mutate, 0, 255).tolist()
+        rotation = rng.uniform(0, 2 * math.pi, size=count).tolist()
+        lifespan = rng.integers(sp.lifespan_range[0], sp.lifespan_range[1] + 1, size=count).tolist()
+        weights = mutated([p.nn for p in parents], rng)
+
+        pool = self.pools[cls]
+        for i, parent in enumerate(parents):
+            # The network is always a new one, earlier Snapshots may still share the old one
+            child = pool.pop() if pool else cls.__new__(cls)
+            child.streams = parent.streams
+            child.nn = NeuralNetwork.from_weights(*weights[i])
+            child.start(self.new_id(cls), parent, x[i], y[i], tuple(colors[i]), rotation[i], lifespan[i], sp.born_energy)
+            if self.events is not None:
+                self.events.birth(child.species_name, child.id, parent.id, child.color)
+            organisms.append(child)
+            index.insert(child)
+
+    # ------------------ Eating ------------------
+    # Once a species has moved, all its meals are found first and handed out afterwards, so who
+    # eats what doesn't depend on the order organisms were updated in
+    def herbivores_eat(self):
+        for plant, herb in self.claim(self.herbivores, self.plant_index):
+            herb.eat(HERB_ENERGY_GAIN)
+            if self.events is not None:
+                self.events.eat(herb.species_name, herb.id, plant.id)
+            self.plant_index.remove(plant)
+            self.plants.remove(plant)
+
+    def carnivores_eat(self):
+        for prey, carn in self.claim(self.carnivores, self.herb_index):
+            carn.eat(prey.energy * CARN_ENERGY_GAIN_PERCENT)
+            if self.events is not None:
+                self.events.eat(carn.species_name, carn.id, prey.id)
+            prey.die(cause="eaten")
+            self.herb_index.remove(prey)
+
+    def claim(self, eaters, index):
+        # (food, eater) for every piece of food within reach of an eater that isn't gestating. Food
+        # within reach of several goes to the closest one, the earliest in the list on ties. Meals
+        # come in the order they were found, so by eater
+        best = {}
+        found = 0
+        for eater in eaters:
+            if not eater.alive or eater.gestating:
+                continue
+            for food in index.nearby(eater.x, eater.y):
+                dx, dy = index.offset(eater.x, eater.y, food.x, food.y)
+                dist2 = dx*dx + dy*dy
+                reach = eater.reach(food)
+                if dist2 < reach * reach:
+                    claim = best.get(food)
+                    if claim is None or dist2 < claim[0]:
+                        best[food] = (dist2, found, eater)
+                    found += 1
+        meals = sorted(best.items(), key=lambda item: item[1][1])
+        return [(food, eater) for food, (_, _, eater) in meals]
+
+    def remove_dead(self, organisms, deaths, pool):
+        # Only the living stay in the lists, so each tick costs as much as the living population.
+        # The dead go to the pool, up to SYS_POOL_SIZE of them, for give_birth to reuse
+        living = []
+        for organism in organisms:
+            if organism.alive:
+                living.append(organism)
+            else:
+                deaths[organism.death_cause] += 1
+                if self.events is not None:
+                    self.events.death(organism.species_name, organism.id, organism.death_cause, organism.age, organism.energy)
+                if len(pool) < SYS_POOL_SIZE:
+                    pool.append(organism)
+        return living
+
+    def is_over(self):
+        return len(self.herbivores) == 0 or len(self.carnivores) == 0 or len(self.plants) == 0
+
+    # ------------------ Data ------------------
+    def update_data(self):
+        if not self.plants and not self.herbivores and not self.carnivores:
+            return
+
+        self.metrics.add(
+            self.tick_count,
+            len(self.plants),
+            len(self.herbivores),
+            len(self.carnivores),
+            self.herb_deaths["starvation"],
+            self.herb_deaths["eaten"],
+            self.herb_deaths["old_age"],
+        )
+        if self.export is not None:
+            self.export.add(self.export_row())
+
+        self.tick_count += 1
+
+    def export_row(self):
+        row = {"tick": self.tick_count, "plants": len(self.plants), "herbivores": len(self.herbivores), "carnivores": len(self.carnivores)}
+        for prefix, organisms, deaths in (("herb", self.herbivores, self.herb_deaths), ("carn", self.carnivores, self.carn_deaths)):
+            for cause, count in deaths.items():
+                row[f"{prefix}_{cause}"] = count
+            n = max(len(organisms), 1) # Zeros once a species has died out
+            row[prefix + "_energy"] = sum(o.energy for o in organisms) / n
+            row[prefix + "_generation"] = sum(o.generation for o in organisms) / n
+            for i, channel in enumerate("rgb"):
+                row[f"{prefix}_{channel}"] = sum(o.color[i] for o in organisms) / n
+        return row
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the simulation without a GUI")
+    parser.add_argument("--ticks", type=int, default=10000, help="Maximum amount of ticks to run for")
+    parser.add_argument("--engine", choices=["object", "vector", "tiled"], default="object", help="Object-per-organism engine, the NumPy array engine, or the array engine with its spatial searches split over processes")
+    parser.add_argument("--size", type=int, nargs=2, default=[SYS_FIELD_WIDTH, SYS_FIELD_HEIGHT], metavar=("W", "H"), help="Field width and height")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes for the tiled engine, all cores by default")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for a reproducible run, a random one is picked and printed otherwise")
+    parser.add_argument("--replay", metavar="FILE", help="Record births, deaths and eating to a replay log that replay.py can check later runs against")
+    parser.add_argument("--export", metavar="PATH", help="Write per-tick population, death and species data to a CSV (PATH ending in .csv) or a directory of .npy chunks")
+    parser.add_argument("--checkpoint", metavar="FILE", help="Save the whole simulation to FILE at the end of the run, and every --every ticks")
+    parser.add_argument("--every", type=int, default=0, metavar="N", help="Ticks between checkpoints, only at the end of the run when 0")
+    parser.add_argument("--resume", metavar="FILE", help="Continue from a checkpoint instead of starting a new world (--size and --seed are taken from it)")
+    parser.add_argument("--activation", choices=ACTIVATIONS, default=None, help="Neuron activation, see neural_network.py. NN_ACTIVATION by default, or the checkpoint's with --resume")
+    args = parser.parse_args()
+    if args.resume and args.replay:
+        parser.error("--replay records from the start of a run, it can't be combined with --resume")
+
+    if args.resume:
+        import checkpoint
+        try:
+            world = checkpoint.load(args.resume, args.engine, args.processes)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.engine == "vector":
+        from vector_world import VectorWorld
+        world = VectorWorld(*args.size, seed=args.seed)
+    elif args.engine == "tiled":
+        from tiled_world import TiledWorld
+        world = TiledWorld(*args.size, seed=args.seed, processes=args.processes)
+    else:
+        world = World(*args.size, seed=args.seed)
+    if args.activation:
+        neural_network.ACTIVATION = args.activation
+    print(f"Seed {world.seed}")
+
+    if args.replay:
+        from replay import ReplayLog, make_header
+        world.events = ReplayLog(args.replay, make_header(world, args.engine))
+
+    if args.export:
+        from export import MetricsWriter
+        world.export = MetricsWriter(args.export)
+    if args.checkpoint:
+        import checkpoint
+    while world.tick_count < args.ticks and not world.is_over():
+        world.step()
+        if args.checkpoint and args.every and world.tick_count % args.every == 0:
+            checkpoint.save(world, args.checkpoint)
+    if args.checkpoint:
+        checkpoint.save(world, args.checkpoint)
+    if args.replay:
+        world.events.close()
+    if args.export:
+        world.export.close()
+    if args.engine == "tiled":
+        world.close()
+
+    plants, herbs, carns = (int(world.metrics.last(name)) for name in ("plants", "herbivores", "carnivores"))
+    print(f"Tick {world.tick_count}: {plants} plants, {herbs} herbivores, {carns} carnivores")